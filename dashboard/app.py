@@ -1,6 +1,11 @@
 """Main Streamlit application"""
+import functools
+import importlib
+import re
+import warnings
 import streamlit as st
-from datetime import datetime, time
+from datetime import datetime, time, timedelta
+from pathlib import Path
 
 # Page config deve ser a primeira coisa
 st.set_page_config(
@@ -10,197 +15,90 @@ st.set_page_config(
     initial_sidebar_state="expanded",
 )
 
-import warnings
-warnings.filterwarnings("ignore", category=FutureWarning)
-
 from components.sidebar import render_sidebar
-from pages import overview, profitability, liquidity, all_metrics, system_health, production
 
-# CSS global
-st.markdown(
-    """
-    <style>
-    /* === BÁSICO === */
-    .main {
-        padding: 0rem 1rem;
-    }
-    
-    .block-container {
-        padding-top: 2rem;
-    }
-    
-    header {
-        visibility: hidden;
-    }
-    
-    /* === ESCONDER MENU DE PÁGINAS PADRÃO === */
-    [data-testid="stSidebarNav"] {
-        display: none !important;
-    }
-    
-    /* === CUSTOMIZAR BOTÃO DE COLLAPSE DA SIDEBAR === */
-    /* Esconde o X padrão */
-    button[kind="header"] svg {
-        display: none;
-    }
-    
-    /* Adiciona seta < quando sidebar está aberta */
-    button[kind="header"]::after {
-        content: "‹";
-        font-size: 2rem;
-        font-weight: bold;
-        color: white;
-        position: absolute;
-        left: 50%;
-        top: 50%;
-        transform: translate(-50%, -50%);
-    }
-    
-    /* Adiciona seta > quando sidebar está fechada */
-    section[data-testid="stSidebar"][aria-expanded="false"] + div button[kind="header"]::after {
-        content: "›";
-    }
-    
-    /* === MÉTRICAS === */
-    .stMetric {
-        background-color: #262730;
-        padding: 15px;
-        border-radius: 10px;
-        border: 1px solid #4a4a55;
-    }
-    
-    .stMetric label {
-        font-size: 0.9rem !important;
-        color: #b3b3b3;
-    }
-    
-    .stMetric [data-testid="stMetricValue"] {
-        font-size: 1.8rem !important;
-    }
-    
-    /* === TABELA DETAILED METRICS - 100% FLUIDA SEM SCROLL === */
-    div[data-testid="stDataFrame"] {
-        width: 100% !important;
-        overflow: visible !important;
-    }
-    
-    div[data-testid="stDataFrame"] > div {
-        width: 100% !important;
-        overflow: visible !important;
-        max-width: 100% !important;
-    }
-    
-    /* Força a tabela interna a ser 100% responsiva */
-    div[data-testid="stDataFrame"] table {
-        width: 100% !important;
-        table-layout: auto !important;
-    }
-    
-    /* Remove qualquer scroll do container pai */
-    div[data-testid="stDataFrame"] > div > div {
-        overflow: visible !important;
-        width: 100% !important;
-    }
-    
-    /* Força células a ajustarem conteúdo */
-    div[data-testid="stDataFrame"] td,
-    div[data-testid="stDataFrame"] th {
-        white-space: normal !important;
-        word-wrap: break-word !important;
-    }
-    
-    /* === GRÁFICOS - LARGURA MÍNIMA PARA EVITAR TEXTOS VERTICAIS === */
-    div[data-testid="stPlotlyChart"] {
-        min-width: 500px !important;
-    }
-    
-    /* === EXPANDERS === */
-    div[data-testid="stExpander"] {
-        border: 1px solid #4a4a55;
-        border-radius: 8px;
-    }
-    
-    /* === BOXES CUSTOMIZADOS === */
-    .production-box {
-        background-color: #1e1e1e;
-        padding: 20px;
-        border-radius: 10px;
-        border-left: 4px solid #00CC96;
-        margin: 10px 0;
-    }
-    
-    .warning-box {
-        background-color: #2d1e1e;
-        padding: 20px;
-        border-radius: 10px;
-        border-left: 4px solid #FFA15A;
-        margin: 10px 0;
-    }
-    
-    .code-box {
-        background-color: #1a1a1a;
-        padding: 15px;
-        border-radius: 8px;
-        font-family: 'Courier New', monospace;
-        font-size: 0.9rem;
-        line-height: 1.6;
-        white-space: pre;
-        overflow-x: auto;
-    }
-    </style>
-    """,
-    unsafe_allow_html=True,
-)
+# Páginas importadas sob demanda (só paga o import da página visitada)
+_PAGES = {
+    "📊 Overview": "pages.overview",
+    "💰 Profitability": "pages.profitability",
+    "💧 Liquidity": "pages.liquidity",
+    "📈 All Metrics": "pages.all_metrics",
+    "🏥 System Health": "pages.system_health",
+    "📚 Production Guide": "pages.production",
+}
+
+# CSS global em assets/custom.css: lido e minificado uma vez por processo, enviado via
+# st.html (sem parser de markdown) num único elemento por rerun. O enableStaticServing do
+# Streamlit 1.40 serve .css como text/plain (nosniff), então um <link> não funcionaria.
+def _load_css(path):
+    """Read a stylesheet and strip comments/whitespace to shrink the per-rerun payload"""
+    css = re.sub(r"/\*.*?\*/", "", path.read_text(encoding="utf-8"), flags=re.S)
+    css = re.sub(r"\s*([{};:,>])\s*", r"\1", css)
+    return f"<style>{' '.join(css.split())}</style>"
+
+
+_GLOBAL_CSS = _load_css(Path(__file__).parent / "assets" / "custom.css")
+
+
+# Horário diário de refresh (após o ETL das 8h)
+_REFRESH_TIME = time(8, 30)
 
 
+def _next_refresh_after(now):
+    """Próximo horário de refresh (8h30 local) depois de `now`"""
+    next_refresh = datetime.combine(now.date(), _REFRESH_TIME)
+    if next_refresh <= now:
+        next_refresh += timedelta(days=1)
+    return next_refresh
+
+
+@st.fragment(run_every=3600)
 def check_auto_refresh():
     """
     Recarrega dados 1x por dia após o ETL (8h SP),
     se o toggle 'Auto' estiver ligado.
-    """
-    now = datetime.now()
 
+    Roda como fragmento com timer de 1h; o próximo horário de refresh
+    é calculado uma vez e só avança quando é ultrapassado.
+    """
     if "auto_refresh" not in st.session_state:
         st.session_state.auto_refresh = True
 
     if not st.session_state.auto_refresh:
         return
 
-    if "last_refresh_date" not in st.session_state:
-        st.session_state.last_refresh_date = now.date()
+    now = datetime.now()
 
-    # 8h30 local (São Paulo)
-    refresh_time = time(8, 30)
+    if "next_refresh_dt" not in st.session_state:
+        st.session_state.next_refresh_dt = _next_refresh_after(now)
 
-    if now.time() > refresh_time and st.session_state.last_refresh_date < now.date():
-        st.session_state.last_refresh_date = now.date()
+    if now >= st.session_state.next_refresh_dt:
+        st.session_state.next_refresh_dt = _next_refresh_after(now)
         st.cache_data.clear()
-        st.cache_resource.clear()
-        st.experimental_rerun()
+        st.rerun()
+
+
+@functools.lru_cache(maxsize=None)
+def _load_page(module_name):
+    """Import a page module on first visit"""
+    return importlib.import_module(module_name)
 
 
 def main():
+    st.html(_GLOBAL_CSS)
+
     check_auto_refresh()
 
-    st.markdown("# 📊 WindBorne Finance Dashboard")
-    st.markdown("### Real-time financial metrics for TEL, ST, and DD")
-    st.markdown("---")
+    st.title("📊 WindBorne Finance Dashboard")
+    st.subheader("Real-time financial metrics for TEL, ST, and DD")
+    st.divider()
 
-    page = render_sidebar()
+    page = render_sidebar(list(_PAGES))
 
-    if page == "📊 Overview":
-        overview.show()
-    elif page == "💰 Profitability":
-        profitability.show()
-    elif page == "💧 Liquidity":
-        liquidity.show()
-    elif page == "📈 All Metrics":
-        all_metrics.show()
-    elif page == "🏥 System Health":
-        system_health.show()
-    elif page == "📚 Production Guide":
-        production.show()
+    _load_page(_PAGES[page]).show()
 
 
 if __name__ == "__main__":
+    # simplefilter sem regex de mensagem; substitui o filtro em vez de empilhar
+    warnings.simplefilter("ignore", FutureWarning)
     main()
\ No newline at end of file
@@ -0,0 +1,21 @@
+"""Plotly charts rendered interactively or as cached server-side SVG"""
+from importlib.util import find_spec
+import streamlit as st
+
+
+# kaleido é opcional; sem ele os gráficos continuam interativos e o toggle some da sidebar
+HAS_KALEIDO = find_spec("kaleido") is not None
+
+
+@st.cache_data(ttl=86400, show_spinner=False)
+def _figure_svg(_fig, key):
+    """SVG markup for a figure, rendered once per key (the figure itself is not hashed)"""
+    return _fig.to_image(format="svg").decode("utf-8")
+
+
+def render_chart(fig, key):
+    """Show a figure as an interactive Plotly chart, or as a static SVG when interactivity is off"""
+    if st.session_state.get("interactive_charts", True) or not HAS_KALEIDO:
+        st.plotly_chart(fig, use_container_width=True)
+    else:
+        st.image(_figure_svg(fig, key), use_container_width=True)
@@ -0,0 +1,18 @@
+"""Metric cards rendered as a single HTML block"""
+import html
+import streamlit as st
+
+
+def render_metrics_grid(rows):
+    """Render (label, value, delta) metric cards as one HTML block; delta is None or (text, is_good)"""
+    cards = []
+    for label, value, delta in rows:
+        delta_html = ""
+        if delta is not None:
+            text, is_good = delta
+            delta_html = f'<div class="metric-delta {"up" if is_good else "down"}">{html.escape(str(text))}</div>'
+        cards.append(
+            f'<div class="stMetric"><label>{html.escape(label)}</label>'
+            f'<div data-testid="stMetricValue">{html.escape(str(value))}</div>{delta_html}</div>'
+        )
+    st.html(f'<div class="metric-grid">{"".join(cards)}</div>')
@@ -2,79 +2,65 @@
 import streamlit as st
 from datetime import datetime
 from database import test_connection  # se o nome for diferente, ajuste aqui
+from components.charts import HAS_KALEIDO
 
 
-# CSS global para deixar o botão Refresh Now azul chamativo
-def _inject_sidebar_css():
-    st.markdown(
-        """
-        <style>
-        /* Botão Refresh Now no sidebar */
-        div[data-testid="stSidebar"] div.stButton > button {
-            background-color: #1f6feb !important;
-            color: white !important;
-            border-radius: 6px !important;
-            border: none !important;
-            font-weight: 600 !important;
-        }
-        div[data-testid="stSidebar"] div.stButton > button:hover {
-            background-color: #1158c7 !important;
-        }
-        </style>
-        """,
-        unsafe_allow_html=True,
-    )
-
-
-def render_sidebar() -> str:
-    """Render the left sidebar and return selected page name."""
+@st.fragment
+def _render_refresh_controls():
+    """Refresh controls and connection status (toggling Auto reruns only this block)"""
+    st.markdown("---")
+    st.markdown("### 🔄 Data Refresh")
 
-    _inject_sidebar_css()
+    # Inicializa estado do auto_refresh
+    if "auto_refresh" not in st.session_state:
+        st.session_state.auto_refresh = True  # ligado por padrão
 
-    with st.sidebar:
-        st.markdown("## 🧭 Navigation")
+    col1, col2 = st.columns([2, 1])
 
-        page = st.radio(
-            "Select View",
-            [
-                "📊 Overview",
-                "💰 Profitability",
-                "💧 Liquidity",
-                "📈 All Metrics",
-                "🏥 System Health",
-                "📚 Production Guide",
-            ],
-            label_visibility="collapsed",
-        )
+    with col1:
+        if st.button("Refresh Now", use_container_width=True, key="refresh_now"):
+            # Só os resultados: o engine/pool do st.connection continua vivo
+            st.cache_data.clear()
+            st.success("Refreshed!")
+            st.rerun()
 
-        st.markdown("---")
-        st.markdown("### 🔄 Data Refresh")
+    with col2:
+        st.toggle("Auto", key="auto_refresh")
 
-        # Inicializa estado do auto_refresh
-        if "auto_refresh" not in st.session_state:
-            st.session_state.auto_refresh = True  # ligado por padrão
+    st.caption(f"Last update: {datetime.now().strftime('%H:%M:%S')}")
+    st.markdown("---")
 
-        col1, col2 = st.columns([2, 1])
+    st.markdown("### 🌐 Connection Status")
+    success, msg = test_connection()
+    if success:
+        st.success(msg)
+    else:
+        st.error(msg)
 
-        with col1:
-            if st.button("Refresh Now", use_container_width=True, key="refresh_now"):
-                st.cache_resource.clear()
-                st.cache_data.clear()
-                st.success("Refreshed!")
-                st.experimental_rerun()
 
-        with col2:
-            st.toggle("Auto", key="auto_refresh")
+def render_sidebar(pages) -> str:
+    """Render the left sidebar and return selected page name."""
 
-        st.caption(f"Last update: {datetime.now().strftime('%H:%M:%S')}")
-        st.markdown("---")
+    with st.sidebar:
+        st.markdown("## 🧭 Navigation")
+
+        page = st.radio(
+            "Select View",
+            pages,
+            label_visibility="collapsed",
+        )
 
-        st.markdown("### 🌐 Connection Status")
-        success, msg = test_connection()
-        if success:
-            st.success(msg)
-        else:
-            st.error(msg)
+        _render_refresh_controls()
+
+        # Fora do fragment: mudar o modo precisa redesenhar a página;
+        # sem kaleido não há SVG estático, então o toggle não é exibido
+        if HAS_KALEIDO:
+            st.toggle(
+                "Interactive charts",
+                value=True,
+                key="interactive_charts",
+                help="Off: static SVG charts rendered on the server",
+            )
 
         st.markdown("---")
         st.markdown("### ℹ️ About")
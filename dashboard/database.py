@@ -1,42 +1,134 @@
 """Database connection management"""
 import os
-from sqlalchemy import create_engine, text  # ← ADICIONAR 'text'
+import socket
+from sqlalchemy import text
 import urllib.parse
+import pandas as pd
 import streamlit as st
 
 
-@st.cache_resource
+def _build_database_url():
+    """Build the PostgreSQL URL from environment variables"""
+    password = urllib.parse.quote_plus(os.getenv('POSTGRES_PASSWORD', ''))
+    host = os.getenv('POSTGRES_HOST', 'postgres')
+    port = os.getenv('POSTGRES_PORT', 5432)
+    database = os.getenv('POSTGRES_DB', 'windborne_finance')
+    user = os.getenv('POSTGRES_USER', 'postgres')
+    
+    return f"postgresql://{user}:{password}@{host}:{port}/{database}"
+
+
+DATABASE_URL = _build_database_url()
+
+# SQLAlchemy usa o driver psycopg (v3); ConnectorX continua com a URL postgresql:// pura
+SQLALCHEMY_URL = DATABASE_URL.replace("postgresql://", "postgresql+psycopg://", 1)
+
+
+def get_connection():
+    """Streamlit SQL connection (engine pooled and cached by st.connection)"""
+    return st.connection(
+        "postgres",
+        type="sql",
+        url=SQLALCHEMY_URL,
+        pool_pre_ping=True,
+        pool_size=10,
+        max_overflow=20,
+        pool_recycle=3600,
+        pool_timeout=30,
+        # TCP keepalive derruba sockets mortos rápido (Docker/VPS)
+        connect_args={
+            'keepalives': 1,
+            'keepalives_idle': 30,
+            'keepalives_interval': 10,
+            'keepalives_count': 3,
+            'application_name': 'streamlit-dashboard'
+        }
+    )
+
+
 def get_db_engine():
     """Get SQLAlchemy engine for pandas queries (cached)"""
     try:
-        password = urllib.parse.quote_plus(os.getenv('POSTGRES_PASSWORD', ''))
-        host = os.getenv('POSTGRES_HOST', 'postgres')
-        port = os.getenv('POSTGRES_PORT', 5432)
-        database = os.getenv('POSTGRES_DB', 'windborne_finance')
-        user = os.getenv('POSTGRES_USER', 'postgres')
-        
-        connection_string = f"postgresql://{user}:{password}@{host}:{port}/{database}"
-        engine = create_engine(
-            connection_string,
-            pool_pre_ping=True,
-            pool_size=5,
-            max_overflow=10
-        )
-        
-        return engine
+        return get_connection().engine
     except Exception as e:
         st.error(f"❌ Database engine creation failed: {e}")
         return None
 
 
+def read_sql(query):
+    """Run a read-only query into a DataFrame via ConnectorX (binary protocol, no per-row Python objects)"""
+    try:
+        import connectorx as cx
+    except ImportError:
+        # Sem connectorx (ambiente de dev): pandas sobre o engine com pool
+        return pd.read_sql(text(query), get_db_engine())
+    
+    return cx.read_sql(DATABASE_URL, query, return_type="pandas")
+
+
+def shrink(df: pd.DataFrame) -> pd.DataFrame:
+    """Down-cast numeric columns (float32, fiscal_year int16) to halve chart payloads"""
+    floats = df.select_dtypes("float64").columns
+    df[floats] = df[floats].astype("float32")
+    if "fiscal_year" in df:
+        df["fiscal_year"] = df["fiscal_year"].astype("int16")
+    return df
+
+
+# persist="disk" sobrevive a restarts; Streamlit ignora ttl em cache persistente,
+# então a invalidação vem do argumento version (muda a cada execução do ETL)
+@st.cache_data(persist="disk", show_spinner=False)
+def load_filter_options(version: str):
+    """Companies, fiscal years and metric names for filters in a single round-trip (keyed on the ETL version)"""
+    with get_db_engine().connect() as conn:
+        return conn.execute(text("""
+            SELECT 
+                ARRAY(SELECT DISTINCT symbol FROM companies ORDER BY symbol) as symbols,
+                ARRAY(SELECT DISTINCT fiscal_year FROM mv_filter_options
+                      ORDER BY fiscal_year DESC) as fiscal_years,
+                ARRAY(SELECT DISTINCT metric_name FROM calculated_metrics
+                      ORDER BY metric_name) as metric_names
+        """)).one()._asdict()
+
+
+def load_companies():
+    """Company symbols for filters (changes only when the daily ETL runs)"""
+    return pd.DataFrame({"symbol": load_filter_options(get_data_version())["symbols"]})
+
+
+def load_fiscal_years():
+    """Fiscal years with calculated metrics, newest first"""
+    return pd.DataFrame({"fiscal_year": load_filter_options(get_data_version())["fiscal_years"]})
+
+
+def load_metric_names() -> list:
+    """Distinct metric names, used to build pivot columns"""
+    return load_filter_options(get_data_version())["metric_names"]
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def get_data_version() -> str:
+    """Timestamp of the latest ETL run, used as a cache key that only changes when the ETL advances"""
+    with get_db_engine().connect() as conn:
+        return str(conn.execute(text("SELECT MAX(run_date) FROM etl_runs")).scalar())
+
+
+@st.cache_data(ttl=30, show_spinner=False)
 def test_connection():
-    """Test database connection"""
+    """Test database connection (cached for 30s so reruns skip the round-trip)"""
+    # Sonda TCP de 200 ms antes do handshake/autenticação do PostgreSQL
+    host = os.getenv('POSTGRES_HOST', 'postgres')
+    port = int(os.getenv('POSTGRES_PORT', 5432))
+    try:
+        socket.create_connection((host, port), timeout=0.2).close()
+    except OSError as e:
+        return False, f"{host}:{port} unreachable ({e})"
+    
     engine = get_db_engine()
     if engine:
         try:
             with engine.connect() as conn:
-                result = conn.execute(text("SELECT version()"))
-                version = result.fetchone()
+                conn.execute(text("SELECT 1"))
                 return True, "PostgreSQL Connected"
         except Exception as e:
             return False, str(e)
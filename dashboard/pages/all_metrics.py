@@ -1,8 +1,69 @@
 """All metrics page with data table and export"""
+import io
 import streamlit as st
 import pandas as pd
+import pyarrow.csv as pacsv
 from datetime import datetime
-from database import get_db_engine
+from database import get_data_version, get_db_engine, load_companies, load_fiscal_years, load_metric_names
+
+
+# Chaveado na versão dos dados: pivot e CSV só são refeitos quando o ETL roda
+@st.cache_data(max_entries=32, show_spinner="Loading metrics...")
+def _metrics_csv(version: str, companies: tuple, years: tuple) -> bytes:
+    """Metrics pivoted server-side to one row per company/year, streamed as CSV by COPY"""
+    from psycopg import ClientCursor
+    
+    metric_names = load_metric_names()
+    if not metric_names:
+        return b""
+    
+    # Uma coluna por métrica via FILTER (pivot feito no PostgreSQL)
+    params = {"symbols": list(companies), "years": list(years)}
+    columns = []
+    for i, name in enumerate(metric_names):
+        params[f"m{i}"] = name
+        alias = '"' + name.replace('"', '""').replace('%', '%%') + '"'
+        # float8: texto curto e exato no CSV, sem Decimal
+        columns.append(
+            f"ROUND(MAX(cm.metric_value) FILTER (WHERE cm.metric_name = %(m{i})s), 2)::float8 as {alias}"
+        )
+    
+    query = f"""
+        SELECT 
+            c.symbol,
+            cm.fiscal_year,
+            {", ".join(columns)}
+        FROM calculated_metrics cm
+        JOIN companies c ON cm.company_id = c.id
+        WHERE c.symbol = ANY(%(symbols)s)
+        AND cm.fiscal_year = ANY(%(years)s)
+        GROUP BY c.symbol, cm.fiscal_year
+        ORDER BY c.symbol, cm.fiscal_year
+    """
+    
+    # COPY não aceita parâmetros de servidor: valores entram como literais escapados
+    raw = get_db_engine().raw_connection()
+    try:
+        conn = raw.driver_connection
+        with ClientCursor(conn) as cur:
+            copy_sql = cur.mogrify(f"COPY ({query}) TO STDOUT WITH CSV HEADER", params)
+        
+        buf = io.BytesIO()
+        with conn.cursor() as cur, cur.copy(copy_sql) as copy:
+            for block in copy:
+                buf.write(block)
+    finally:
+        raw.close()
+    return buf.getvalue()
+
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def _fetch_metrics(version: str, companies: tuple, years: tuple) -> pd.DataFrame:
+    """Metrics table parsed from the COPY output by Arrow's CSV reader"""
+    data = _metrics_csv(version, companies, years)
+    if not data:
+        return pd.DataFrame()
+    return pacsv.read_csv(io.BytesIO(data)).to_pandas(types_mapper=pd.ArrowDtype)
 
 
 def show():
@@ -14,12 +75,18 @@ def show():
         st.error("❌ Cannot connect to database")
         return
     
+    _render_metrics_table()
+
+
+@st.fragment
+def _render_metrics_table():
+    """Filters, table and export (reruns alone when a filter changes)"""
     try:
         # Filters
         col1, col2 = st.columns(2)
         
         with col1:
-            companies_df = pd.read_sql("SELECT DISTINCT symbol FROM companies ORDER BY symbol", engine)
+            companies_df = load_companies()
             selected_companies = st.multiselect(
                 "Companies",
                 companies_df['symbol'].tolist(),
@@ -27,10 +94,7 @@ def show():
             )
         
         with col2:
-            years_df = pd.read_sql("""
-                SELECT DISTINCT fiscal_year FROM calculated_metrics 
-                ORDER BY fiscal_year DESC
-            """, engine)
+            years_df = load_fiscal_years()
             selected_years = st.multiselect(
                 "Years",
                 years_df['fiscal_year'].tolist(),
@@ -41,52 +105,24 @@ def show():
             st.info("ℹ️ Select filters above")
             return
         
-        companies_str = "','".join(selected_companies)
-        years_str = ",".join(map(str, selected_years))
-        
-        query = f"""
-            SELECT 
-                c.symbol,
-                cm.fiscal_year,
-                cm.metric_name,
-                cm.metric_value,
-                cm.metric_category
-            FROM calculated_metrics cm
-            JOIN companies c ON cm.company_id = c.id
-            WHERE c.symbol IN ('{companies_str}')
-            AND cm.fiscal_year IN ({years_str})
-            ORDER BY c.symbol, cm.fiscal_year DESC, cm.metric_category, cm.metric_name
-        """
-        
-        df = pd.read_sql(query, engine)
+        version = get_data_version()
+        companies = tuple(sorted(selected_companies))
+        years = tuple(sorted(selected_years))
+        df = _fetch_metrics(version, companies, years)
         
         if df.empty:
             st.warning("⚠️ No data available")
             return
         
-        st.success(f"✅ Found {len(df)} metrics")
-        
-        # Pivot for better view
-        pivot_df = df.pivot_table(
-            index=['symbol', 'fiscal_year'],
-            columns='metric_name',
-            values='metric_value',
-            aggfunc='first'
-        ).reset_index()
-        
-        # Format numbers
-        numeric_cols = pivot_df.select_dtypes(include=['float64', 'int64']).columns
-        for col in numeric_cols:
-            if col not in ['symbol', 'fiscal_year']:
-                pivot_df[col] = pivot_df[col].round(2)
+        metrics_found = int(df.drop(columns=['symbol', 'fiscal_year']).notna().sum().sum())
+        st.success(f"✅ Found {metrics_found} metrics")
         
-        st.dataframe(pivot_df, use_container_width=True, height=600)
+        st.dataframe(df, use_container_width=True, height=600)
         
         # Download button
-        csv = pivot_df.to_csv(index=False)
         st.download_button(
             label="📥 Download CSV",
-            data=csv,
+            data=_metrics_csv(version, companies, years),
             file_name=f"windborne_metrics_{datetime.now().strftime('%Y%m%d')}.csv",
             mime="text/csv"
         )
@@ -1,10 +1,180 @@
 """Liquidity analysis page"""
 import streamlit as st
 import pandas as pd
+import plotly.express as px
 import plotly.graph_objects as go
-from database import get_db_engine
+from plotly.subplots import make_subplots
+from database import get_db_engine, read_sql, shrink
 
 
+# Dados só mudam com o ETL diário; figuras são montadas uma vez e servidas do cache
+@st.cache_data(ttl=86400, show_spinner=False)
+def _load_latest():
+    """Latest-year liquidity ratios per company"""
+    return shrink(read_sql("""
+        SELECT 
+            c.symbol,
+            c.name,
+            latest.fiscal_year,
+            MAX(cm.metric_value) FILTER (WHERE cm.metric_name = 'current_ratio') as current_ratio,
+            MAX(cm.metric_value) FILTER (WHERE cm.metric_name = 'quick_ratio') as quick_ratio,
+            MAX(cm.metric_value) FILTER (WHERE cm.metric_name = 'cash_ratio') as cash_ratio
+        FROM (
+            SELECT DISTINCT ON (company_id) company_id, fiscal_year
+            FROM calculated_metrics
+            ORDER BY company_id, fiscal_year DESC
+        ) latest
+        JOIN companies c ON c.id = latest.company_id
+        JOIN calculated_metrics cm 
+            ON cm.company_id = latest.company_id 
+            AND cm.fiscal_year = latest.fiscal_year
+        WHERE cm.metric_name IN ('current_ratio', 'quick_ratio', 'cash_ratio')
+        GROUP BY c.symbol, c.name, latest.fiscal_year
+        ORDER BY c.symbol
+    """))
+
+
+@st.cache_data(ttl=86400, show_spinner=False)
+def _load_history():
+    """Current and quick ratios for every fiscal year"""
+    return shrink(read_sql("""
+        SELECT 
+            c.symbol,
+            cm.fiscal_year,
+            MAX(cm.metric_value) FILTER (WHERE cm.metric_name = 'current_ratio') as current_ratio,
+            MAX(cm.metric_value) FILTER (WHERE cm.metric_name = 'quick_ratio') as quick_ratio
+        FROM companies c
+        JOIN calculated_metrics cm ON c.id = cm.company_id
+        WHERE cm.metric_name IN ('current_ratio', 'quick_ratio')
+        GROUP BY c.symbol, cm.fiscal_year
+        ORDER BY c.symbol, cm.fiscal_year
+    """))
+
+
+def _ratio_labels(series):
+    """Per-bar text templates: formatted in the browser, "N/A" for missing ratios"""
+    return series.isna().map({True: "N/A", False: "%{y:.2f}"}).to_numpy()
+
+
+@st.cache_data(ttl=86400, show_spinner=False)
+def _build_comparison_chart():
+    """Grouped bar chart of the latest liquidity ratios"""
+    df_latest = _load_latest()
+    fig = go.Figure()
+    
+    # Current Ratio
+    fig.add_trace(go.Bar(
+        name='Current Ratio',
+        x=df_latest['symbol'],
+        y=df_latest['current_ratio'].fillna(0).to_numpy(),
+        marker_color='#636EFA',
+        texttemplate=_ratio_labels(df_latest['current_ratio']),
+        textposition='auto',
+        textfont=dict(size=14, color='white', family='Arial Black')
+    ))
+    
+    # Quick Ratio
+    fig.add_trace(go.Bar(
+        name='Quick Ratio',
+        x=df_latest['symbol'],
+        y=df_latest['quick_ratio'].fillna(0).to_numpy(),
+        marker_color='#00CC96',
+        texttemplate=_ratio_labels(df_latest['quick_ratio']),
+        textposition='auto',
+        textfont=dict(size=14, color='white', family='Arial Black')
+    ))
+    
+    # Cash Ratio
+    fig.add_trace(go.Bar(
+        name='Cash Ratio',
+        x=df_latest['symbol'],
+        y=df_latest['cash_ratio'].fillna(0).to_numpy(),
+        marker_color='#FFA15A',
+        texttemplate=_ratio_labels(df_latest['cash_ratio']),
+        textposition='auto',
+        textfont=dict(size=14, color='white', family='Arial Black')
+    ))
+    
+    # Linha de referência em 1.0
+    fig.add_hline(
+        y=1.0,
+        line_dash="dash",
+        line_color="gray",
+        annotation_text="Minimum Safe Level (1.0)",
+        annotation_position="right"
+    )
+    
+    fig.update_layout(
+        uirevision='comparison',  # Plotly reaproveita os traces no rerender
+        barmode='group',
+        height=500,
+        xaxis_title="Company",
+        yaxis_title="Ratio",
+        template="plotly_dark",
+        legend=dict(
+            orientation="h",
+            yanchor="bottom",
+            y=1.02,
+            xanchor="right",
+            x=1
+        ),
+        hovermode='x unified'
+    )
+    
+    return fig
+
+
+# Colunas do histórico, uma por subplot
+_HISTORY_RATIOS = (('current_ratio', 'Current Ratio'), ('quick_ratio', 'Quick Ratio'))
+
+
+@st.cache_data(ttl=86400, show_spinner=False)
+def _build_history_chart():
+    """Per-company timelines of current and quick ratios, side by side in one figure"""
+    df_history = _load_history()
+    fig = make_subplots(rows=1, cols=2, subplot_titles=[label for _, label in _HISTORY_RATIOS])
+    colors = px.colors.qualitative.Plotly
+    
+    for i, (symbol, df_symbol) in enumerate(df_history.groupby('symbol', sort=False)):
+        color = colors[i % len(colors)]
+        for col, (column, label) in enumerate(_HISTORY_RATIOS, start=1):
+            fig.add_scattergl(
+                x=df_symbol['fiscal_year'].to_numpy(),
+                y=df_symbol[column].to_numpy(),
+                mode='lines+markers',
+                name=symbol,
+                legendgroup=symbol,
+                showlegend=col == 1,
+                line=dict(width=3, color=color),
+                marker=dict(size=10),
+                hovertemplate=f'<b>%{{fullData.name}}</b><br>Year: %{{x}}<br>{label}: %{{y:.2f}}<extra></extra>',
+                row=1,
+                col=col
+            )
+    
+    for col in (1, 2):
+        fig.add_hline(
+            y=1.0,
+            line_dash="dash",
+            line_color="gray",
+            annotation_text="Safe Level",
+            row=1,
+            col=col
+        )
+    
+    fig.update_xaxes(title_text="Fiscal Year")
+    fig.update_yaxes(title_text="Ratio", col=1)
+    fig.update_layout(
+        uirevision='history',
+        template="plotly_dark",
+        height=400,
+        hovermode='x unified'
+    )
+    
+    return fig
+
+
+@st.fragment
 def show():
     """Display liquidity analysis"""
     st.markdown("## 💧 Liquidity Analysis")
@@ -17,64 +187,42 @@ def show():
     # Latest Liquidity Ratios (Horizontal com wrap automático)
     st.markdown("## 📊 Latest Liquidity Ratios")
     
-    query_latest = """
-        SELECT 
-            c.symbol,
-            c.name,
-            cm.fiscal_year,
-            MAX(CASE WHEN cm.metric_name = 'current_ratio' THEN cm.metric_value END) as current_ratio,
-            MAX(CASE WHEN cm.metric_name = 'quick_ratio' THEN cm.metric_value END) as quick_ratio,
-            MAX(CASE WHEN cm.metric_name = 'cash_ratio' THEN cm.metric_value END) as cash_ratio
-        FROM companies c
-        JOIN calculated_metrics cm ON c.id = cm.company_id
-        WHERE cm.fiscal_year = (
-            SELECT MAX(fiscal_year) 
-            FROM calculated_metrics 
-            WHERE company_id = c.id
-        )
-        AND cm.metric_name IN ('current_ratio', 'quick_ratio', 'cash_ratio')
-        GROUP BY c.symbol, c.name, cm.fiscal_year
-        ORDER BY c.symbol
-    """
-    
-    df_latest = pd.read_sql(query_latest, engine)
+    df_latest = _load_latest()
     
     if not df_latest.empty:
         # Layout responsivo: 3 empresas por linha
         companies_per_row = 3
-        rows_needed = (len(df_latest) + companies_per_row - 1) // companies_per_row
         
-        idx = 0
-        for row_num in range(rows_needed):
+        # Colunas extraídas uma vez como arrays; sem Series por linha (iloc)
+        cards = list(zip(
+            df_latest['symbol'].to_numpy(),
+            df_latest['name'].to_numpy(),
+            df_latest['current_ratio'].to_numpy(),
+            df_latest['quick_ratio'].to_numpy(),
+            df_latest['cash_ratio'].to_numpy()
+        ))
+        
+        for start in range(0, len(cards), companies_per_row):
             cols = st.columns(companies_per_row)
             
-            for col_num, col in enumerate(cols):
-                if idx < len(df_latest):
-                    row_data = df_latest.iloc[idx]
-                    
-                    with col:
-                        st.markdown(f"### {row_data['symbol']}")
-                        st.caption(row_data['name'])
-                        
-                        current = row_data['current_ratio']
-                        quick = row_data['quick_ratio']
-                        cash = row_data['cash_ratio']
-                        
-                        st.metric(
-                            "Current",
-                            f"{current:.2f}" if pd.notna(current) else "N/A"
-                        )
-                        st.metric(
-                            "Quick",
-                            f"{quick:.2f}" if pd.notna(quick) else "N/A",
-                            delta=f"↑ {quick:.2f}" if pd.notna(quick) and quick > 1 else None
-                        )
-                        st.metric(
-                            "Cash",
-                            f"{cash:.2f}" if pd.notna(cash) else "N/A"
-                        )
+            for col, (symbol, name, current, quick, cash) in zip(cols, cards[start:start + companies_per_row]):
+                with col:
+                    st.markdown(f"### {symbol}")
+                    st.caption(name)
                     
-                    idx += 1
+                    st.metric(
+                        "Current",
+                        f"{current:.2f}" if pd.notna(current) else "N/A"
+                    )
+                    st.metric(
+                        "Quick",
+                        f"{quick:.2f}" if pd.notna(quick) else "N/A",
+                        delta=f"↑ {quick:.2f}" if pd.notna(quick) and quick > 1 else None
+                    )
+                    st.metric(
+                        "Cash",
+                        f"{cash:.2f}" if pd.notna(cash) else "N/A"
+                    )
     else:
         st.warning("⚠️ No liquidity data available")
     
@@ -84,66 +232,7 @@ def show():
     st.markdown("## 📊 Liquidity Ratios Comparison")
     
     if not df_latest.empty:
-        fig = go.Figure()
-        
-        # Current Ratio
-        fig.add_trace(go.Bar(
-            name='Current Ratio',
-            x=df_latest['symbol'],
-            y=df_latest['current_ratio'].fillna(0),
-            marker_color='#636EFA',
-            text=df_latest['current_ratio'].apply(lambda x: f"{x:.2f}" if pd.notna(x) else "N/A"),
-            textposition='auto',
-            textfont=dict(size=14, color='white', family='Arial Black')
-        ))
-        
-        # Quick Ratio
-        fig.add_trace(go.Bar(
-            name='Quick Ratio',
-            x=df_latest['symbol'],
-            y=df_latest['quick_ratio'].fillna(0),
-            marker_color='#00CC96',
-            text=df_latest['quick_ratio'].apply(lambda x: f"{x:.2f}" if pd.notna(x) else "N/A"),
-            textposition='auto',
-            textfont=dict(size=14, color='white', family='Arial Black')
-        ))
-        
-        # Cash Ratio
-        fig.add_trace(go.Bar(
-            name='Cash Ratio',
-            x=df_latest['symbol'],
-            y=df_latest['cash_ratio'].fillna(0),
-            marker_color='#FFA15A',
-            text=df_latest['cash_ratio'].apply(lambda x: f"{x:.2f}" if pd.notna(x) else "N/A"),
-            textposition='auto',
-            textfont=dict(size=14, color='white', family='Arial Black')
-        ))
-        
-        # Linha de referência em 1.0
-        fig.add_hline(
-            y=1.0,
-            line_dash="dash",
-            line_color="gray",
-            annotation_text="Minimum Safe Level (1.0)",
-            annotation_position="right"
-        )
-        
-        fig.update_layout(
-            barmode='group',
-            height=500,
-            xaxis_title="Company",
-            yaxis_title="Ratio",
-            template="plotly_dark",
-            legend=dict(
-                orientation="h",
-                yanchor="bottom",
-                y=1.02,
-                xanchor="right",
-                x=1
-            ),
-            hovermode='x unified'
-        )
-        
+        fig = _build_comparison_chart()
         st.plotly_chart(fig, use_container_width=True)
         
         # Interpretação
@@ -169,89 +258,10 @@ def show():
     # Historical Liquidity Trend
     st.markdown("## 📈 Historical Liquidity Trend")
     
-    query_history = """
-        SELECT 
-            c.symbol,
-            cm.fiscal_year,
-            MAX(CASE WHEN cm.metric_name = 'current_ratio' THEN cm.metric_value END) as current_ratio,
-            MAX(CASE WHEN cm.metric_name = 'quick_ratio' THEN cm.metric_value END) as quick_ratio
-        FROM companies c
-        JOIN calculated_metrics cm ON c.id = cm.company_id
-        WHERE cm.metric_name IN ('current_ratio', 'quick_ratio')
-        GROUP BY c.symbol, cm.fiscal_year
-        ORDER BY c.symbol, cm.fiscal_year
-    """
-    
-    df_history = pd.read_sql(query_history, engine)
+    df_history = _load_history()
     
     if not df_history.empty:
-        # Current Ratio Timeline
-        fig_current = go.Figure()
-        
-        for symbol in df_history['symbol'].unique():
-            df_symbol = df_history[df_history['symbol'] == symbol]
-            
-            fig_current.add_trace(go.Scatter(
-                x=df_symbol['fiscal_year'],
-                y=df_symbol['current_ratio'],
-                mode='lines+markers',
-                name=symbol,
-                line=dict(width=3),
-                marker=dict(size=10),
-                hovertemplate='<b>%{fullData.name}</b><br>Year: %{x}<br>Current Ratio: %{y:.2f}<extra></extra>'
-            ))
-        
-        fig_current.add_hline(
-            y=1.0,
-            line_dash="dash",
-            line_color="gray",
-            annotation_text="Safe Level"
-        )
-        
-        fig_current.update_layout(
-            title="Current Ratio Over Time",
-            xaxis_title="Fiscal Year",
-            yaxis_title="Current Ratio",
-            template="plotly_dark",
-            height=400,
-            hovermode='x unified'
-        )
-        
-        st.plotly_chart(fig_current, use_container_width=True)
-        
-        # Quick Ratio Timeline
-        fig_quick = go.Figure()
-        
-        for symbol in df_history['symbol'].unique():
-            df_symbol = df_history[df_history['symbol'] == symbol]
-            
-            fig_quick.add_trace(go.Scatter(
-                x=df_symbol['fiscal_year'],
-                y=df_symbol['quick_ratio'],
-                mode='lines+markers',
-                name=symbol,
-                line=dict(width=3),
-                marker=dict(size=10),
-                hovertemplate='<b>%{fullData.name}</b><br>Year: %{x}<br>Quick Ratio: %{y:.2f}<extra></extra>'
-            ))
-        
-        fig_quick.add_hline(
-            y=1.0,
-            line_dash="dash",
-            line_color="gray",
-            annotation_text="Safe Level"
-        )
-        
-        fig_quick.update_layout(
-            title="Quick Ratio Over Time",
-            xaxis_title="Fiscal Year",
-            yaxis_title="Quick Ratio",
-            template="plotly_dark",
-            height=400,
-            hovermode='x unified'
-        )
-        
-        st.plotly_chart(fig_quick, use_container_width=True)
+        st.plotly_chart(_build_history_chart(), use_container_width=True)
     else:
         st.info("👉 No historical data available yet")
     
@@ -262,11 +272,15 @@ def show():
     
     if not df_latest.empty:
         # Preparar dados para tabela
-        table_data = df_latest[['symbol', 'name', 'fiscal_year', 'current_ratio', 'quick_ratio', 'cash_ratio']].copy()
-        table_data.columns = ['Symbol', 'Company', 'Year', 'Current Ratio', 'Quick Ratio', 'Cash Ratio']
-        
-        # Formatar valores
-        for col in ['Current Ratio', 'Quick Ratio', 'Cash Ratio']:
-            table_data[col] = table_data[col].apply(lambda x: f"{x:.2f}" if pd.notna(x) else "N/A")
+        table_data = df_latest[['symbol', 'name', 'fiscal_year', 'current_ratio', 'quick_ratio', 'cash_ratio']].set_axis(
+            ['Symbol', 'Company', 'Year', 'Current Ratio', 'Quick Ratio', 'Cash Ratio'], axis=1
+        )
         
-        st.dataframe(table_data, use_container_width=True, hide_index=True)
\ No newline at end of file
+        # Formatação feita no front-end
+        number = st.column_config.NumberColumn(format="%.2f")
+        st.dataframe(
+            table_data,
+            use_container_width=True,
+            hide_index=True,
+            column_config={col: number for col in ['Current Ratio', 'Quick Ratio', 'Cash Ratio']}
+        )
\ No newline at end of file
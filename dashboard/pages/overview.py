@@ -2,9 +2,190 @@
 import streamlit as st
 import pandas as pd
 import plotly.graph_objects as go
-from database import get_db_engine
-
+from sqlalchemy import text
+from components.charts import render_chart
+from components.metrics import render_metrics_grid
+from database import get_db_engine, read_sql, shrink
+
+
+# KPIs e desempenho só mudam com o ETL diário
+@st.cache_data(ttl=86400, show_spinner=False)
+def _load_kpis():
+    """Companies, years, metric count and last update in a single round-trip"""
+    with get_db_engine().connect() as conn:
+        return tuple(conn.execute(text("""
+            SELECT
+                (SELECT COUNT(*) FROM companies) as companies_count,
+                (SELECT COUNT(DISTINCT fiscal_year) FROM calculated_metrics) as years_count,
+                (SELECT COUNT(*) FROM calculated_metrics) as metrics_count,
+                (SELECT MAX(updated_at) FROM companies) as last_update
+        """)).one())
+
+
+@st.cache_data(ttl=86400, show_spinner=False)
+def _load_latest_performance():
+    """Key margins, current ratio and growth for each company's latest year (precomputed by the ETL)"""
+    return shrink(read_sql("""
+        SELECT 
+            symbol,
+            name,
+            fiscal_year,
+            gross_margin,
+            operating_margin,
+            net_margin,
+            current_ratio,
+            revenue_growth
+        FROM mv_latest_per_company
+        ORDER BY symbol
+    """))
+
+
+@st.cache_data(ttl=86400, show_spinner=False)
+def _build_margins_chart():
+    """Grouped bar chart of gross/operating/net margins for the latest year"""
+    df = _load_latest_performance()
+    fig = go.Figure()
+
+    for col_name, name, color in [
+        ("gross_margin", "Gross Margin", "#00CC96"),
+        ("operating_margin", "Operating Margin", "#AB63FA"),
+        ("net_margin", "Net Margin", "#FFA15A"),
+    ]:
+        fig.add_trace(
+            go.Bar(
+                name=name,
+                x=df["symbol"],
+                y=df[col_name].to_numpy(),
+                texttemplate="%{y:.1f}%",  # formatado no browser
+                textposition="auto",
+                textangle=0,  # FORÇA TEXTO HORIZONTAL (só funciona em Bar)
+                textfont=dict(
+                    size=14,
+                    color="white",
+                    family="Arial Black",
+                ),
+                marker_color=color,
+                customdata=df[["fiscal_year"]].to_numpy(),
+                hovertemplate=(
+                    "<b>%{x}</b><br>"
+                    "Year: %{customdata[0]}<br>"
+                    + name
+                    + ": %{y:.2f}%<extra></extra>"
+                ),
+            )
+        )
 
+    fig.update_layout(
+        uirevision="margins",  # Plotly reaproveita os traces no rerender
+        barmode="group",
+        height=450,
+        xaxis_title="Company",
+        yaxis_title="Margin (%)",
+        template="plotly_dark",
+        legend=dict(
+            orientation="h",
+            yanchor="bottom",
+            y=1.02,
+            xanchor="right",
+            x=1,
+        ),
+        margin=dict(l=60, r=60, t=50, b=80),
+        xaxis=dict(
+            tickangle=0,  # labels do eixo X sempre horizontais
+        ),
+    )
+
+    return fig
+
+
+@st.cache_data(ttl=86400, show_spinner=False)
+def _build_health_chart():
+    """Current ratio bars with revenue growth on a secondary axis"""
+    df = _load_latest_performance()
+    fig = go.Figure()
+
+    # Current Ratio (barras)
+    fig.add_trace(
+        go.Bar(
+            name="Current Ratio",
+            x=df["symbol"],
+            y=df["current_ratio"].to_numpy(),
+            yaxis="y",
+            marker_color="#636EFA",
+            texttemplate="%{y:.2f}",
+            textposition="auto",
+            textangle=0,  # FORÇA TEXTO HORIZONTAL (só funciona em Bar)
+            textfont=dict(
+                size=14,
+                color="white",
+                family="Arial Black",
+            ),
+            customdata=df[["fiscal_year"]].to_numpy(),
+            hovertemplate=(
+                "<b>%{x}</b><br>"
+                "Year: %{customdata[0]}<br>"
+                "Current Ratio: %{y:.2f}<extra></extra>"
+            ),
+        )
+    )
+
+    # Revenue Growth (linha) - SEM textangle
+    fig.add_trace(
+        go.Scatter(
+            name="Revenue Growth (%)",
+            x=df["symbol"],
+            y=df["revenue_growth"].to_numpy(),
+            yaxis="y2",
+            mode="lines+markers+text",
+            line=dict(color="#EF553B", width=3),
+            marker=dict(size=12, color="#EF553B"),
+            textposition="top center",
+            # REMOVIDO textangle (não existe para Scatter)
+            textfont=dict(
+                size=12,
+                color="white",
+                family="Arial Black",
+            ),
+            texttemplate="%{y:.1f}%",
+            cliponaxis=False,
+            customdata=df[["fiscal_year"]].to_numpy(),
+            hovertemplate=(
+                "<b>%{x}</b><br>"
+                "Year: %{customdata[0]}<br>"
+                "Revenue Growth: %{y:.2f}%<extra></extra>"
+            ),
+        )
+    )
+
+    fig.update_layout(
+        uirevision="health",
+        height=450,
+        xaxis_title="Company",
+        yaxis=dict(title="Current Ratio", side="left"),
+        yaxis2=dict(
+            title="Revenue Growth (%)",
+            overlaying="y",
+            side="right",
+        ),
+        template="plotly_dark",
+        legend=dict(
+            orientation="h",
+            yanchor="bottom",
+            y=1.02,
+            xanchor="right",
+            x=1,
+        ),
+        hovermode="x unified",
+        margin=dict(l=60, r=150, t=50, b=80),
+        xaxis=dict(
+            tickangle=0,
+        ),
+    )
+
+    return fig
+
+
+@st.fragment
 def show():
     """Display overview page with latest metrics"""
     st.markdown("## 📊 Overview")
@@ -17,231 +198,50 @@ def show():
     # Top-level metrics
     st.markdown("### 📈 Key Statistics")
 
-    col1, col2, col3, col4 = st.columns(4)
+    companies_count, years_count, metrics_count, last_update = _load_kpis()
 
-    with col1:
-        companies_count = pd.read_sql(
-            "SELECT COUNT(*) as count FROM companies", engine
-        )
-        st.metric("🏢 Companies", companies_count["count"].iloc[0])
-
-    with col2:
-        years_query = """
-            SELECT COUNT(DISTINCT fiscal_year) as count 
-            FROM calculated_metrics
-        """
-        years_count = pd.read_sql(years_query, engine)
-        st.metric("📅 Years of Data", years_count["count"].iloc[0])
-
-    with col3:
-        metrics_query = """
-            SELECT COUNT(*) as count 
-            FROM calculated_metrics
-        """
-        metrics_count = pd.read_sql(metrics_query, engine)
-        st.metric("📊 Total Metrics", metrics_count["count"].iloc[0])
-
-    with col4:
-        last_update_query = """
-            SELECT MAX(updated_at) as last_update 
-            FROM companies
-        """
-        last_update = pd.read_sql(last_update_query, engine)
-        if not last_update.empty and pd.notna(last_update["last_update"].iloc[0]):
-            st.metric(
-                "🕐 Last Update",
-                last_update["last_update"].iloc[0].strftime("%m/%d/%Y"),
-            )
-        else:
-            st.metric("🕐 Last Update", "N/A")
+    render_metrics_grid([
+        ("🏢 Companies", companies_count, None),
+        ("📅 Years of Data", years_count, None),
+        ("📊 Total Metrics", metrics_count, None),
+        ("🕐 Last Update", last_update.strftime("%m/%d/%Y") if last_update is not None else "N/A", None),
+    ])
 
     st.markdown("---")
 
     # Latest Performance Section
     st.markdown("## 📊 Latest Performance (Most Recent Year Per Company)")
 
-    query = """
-        SELECT 
-            c.symbol,
-            c.name,
-            cm.fiscal_year,
-            MAX(CASE WHEN cm.metric_name = 'gross_margin_pct' THEN cm.metric_value END) as gross_margin,
-            MAX(CASE WHEN cm.metric_name = 'operating_margin_pct' THEN cm.metric_value END) as operating_margin,
-            MAX(CASE WHEN cm.metric_name = 'net_margin_pct' THEN cm.metric_value END) as net_margin,
-            MAX(CASE WHEN cm.metric_name = 'current_ratio' THEN cm.metric_value END) as current_ratio,
-            MAX(CASE WHEN cm.metric_name = 'revenue_yoy_pct' THEN cm.metric_value END) as revenue_growth
-        FROM companies c
-        JOIN calculated_metrics cm ON c.id = cm.company_id
-        WHERE cm.fiscal_year = (
-            SELECT MAX(fiscal_year) 
-            FROM calculated_metrics 
-            WHERE company_id = c.id
-        )
-        GROUP BY c.symbol, c.name, cm.fiscal_year
-        ORDER BY c.symbol
-    """
-
-    df = pd.read_sql(query, engine)
+    df = _load_latest_performance()
 
     if not df.empty:
         # Info box showing which years are displayed
-        years_shown = df.groupby("symbol")["fiscal_year"].first().to_dict()
+        # Já há uma linha por empresa (ordenada por symbol): sem groupby
+        years_shown = df.drop_duplicates("symbol")
         years_text = ", ".join(
-            [f"{symbol}: {year}" for symbol, year in years_shown.items()]
+            f"{symbol}: {year}"
+            for symbol, year in zip(years_shown["symbol"], years_shown["fiscal_year"])
         )
         st.info(f"📅 Years shown: {years_text}")
 
         st.markdown("---")
 
+        # Chave do SVG derivada dos dados: um novo ETL/Refresh gera outro SVG
+        data_key = pd.util.hash_pandas_object(df, index=False).sum()
+
         # Two column layout for charts
         col1, col2 = st.columns(2)
 
         # ---------------- Profitability ----------------
         with col1:
             st.markdown("### 💰 Profitability Margins")
-            fig = go.Figure()
-
-            for col_name, name, color in [
-                ("gross_margin", "Gross Margin", "#00CC96"),
-                ("operating_margin", "Operating Margin", "#AB63FA"),
-                ("net_margin", "Net Margin", "#FFA15A"),
-            ]:
-                fig.add_trace(
-                    go.Bar(
-                        name=name,
-                        x=df["symbol"],
-                        y=df[col_name],
-                        text=df[col_name].apply(
-                            lambda x: f"{x:.1f}%" if pd.notna(x) else "N/A"
-                        ),
-                        textposition="auto",
-                        textangle=0,  # FORÇA TEXTO HORIZONTAL (só funciona em Bar)
-                        textfont=dict(
-                            size=14,
-                            color="white",
-                            family="Arial Black",
-                        ),
-                        marker_color=color,
-                        customdata=df[["fiscal_year"]],
-                        hovertemplate=(
-                            "<b>%{x}</b><br>"
-                            "Year: %{customdata[0]}<br>"
-                            + name
-                            + ": %{y:.2f}%<extra></extra>"
-                        ),
-                    )
-                )
-
-            fig.update_layout(
-                barmode="group",
-                height=450,
-                xaxis_title="Company",
-                yaxis_title="Margin (%)",
-                template="plotly_dark",
-                legend=dict(
-                    orientation="h",
-                    yanchor="bottom",
-                    y=1.02,
-                    xanchor="right",
-                    x=1,
-                ),
-                margin=dict(l=60, r=60, t=50, b=80),
-                xaxis=dict(
-                    tickangle=0,  # labels do eixo X sempre horizontais
-                ),
-            )
-
-            st.plotly_chart(fig, use_container_width=True)
+            render_chart(_build_margins_chart(), f"overview-margins-{data_key}")
 
         # ---------------- Financial Health ----------------
         with col2:
             st.markdown("### 📊 Financial Health")
 
-            fig = go.Figure()
-
-            # Current Ratio (barras)
-            fig.add_trace(
-                go.Bar(
-                    name="Current Ratio",
-                    x=df["symbol"],
-                    y=df["current_ratio"],
-                    yaxis="y",
-                    marker_color="#636EFA",
-                    text=df["current_ratio"].apply(
-                        lambda x: f"{x:.2f}" if pd.notna(x) else "N/A"
-                    ),
-                    textposition="auto",
-                    textangle=0,  # FORÇA TEXTO HORIZONTAL (só funciona em Bar)
-                    textfont=dict(
-                        size=14,
-                        color="white",
-                        family="Arial Black",
-                    ),
-                    customdata=df[["fiscal_year"]],
-                    hovertemplate=(
-                        "<b>%{x}</b><br>"
-                        "Year: %{customdata[0]}<br>"
-                        "Current Ratio: %{y:.2f}<extra></extra>"
-                    ),
-                )
-            )
-
-            # Revenue Growth (linha) - SEM textangle
-            fig.add_trace(
-                go.Scatter(
-                    name="Revenue Growth (%)",
-                    x=df["symbol"],
-                    y=df["revenue_growth"],
-                    yaxis="y2",
-                    mode="lines+markers+text",
-                    line=dict(color="#EF553B", width=3),
-                    marker=dict(size=12, color="#EF553B"),
-                    text=df["revenue_growth"].apply(
-                        lambda x: f"{x:.1f}%" if pd.notna(x) else "N/A"
-                    ),
-                    textposition="top center",
-                    # REMOVIDO textangle (não existe para Scatter)
-                    textfont=dict(
-                        size=12,
-                        color="white",
-                        family="Arial Black",
-                    ),
-                    texttemplate="%{text}",
-                    cliponaxis=False,
-                    customdata=df[["fiscal_year"]],
-                    hovertemplate=(
-                        "<b>%{x}</b><br>"
-                        "Year: %{customdata[0]}<br>"
-                        "Revenue Growth: %{y:.2f}%<extra></extra>"
-                    ),
-                )
-            )
-
-            fig.update_layout(
-                height=450,
-                xaxis_title="Company",
-                yaxis=dict(title="Current Ratio", side="left"),
-                yaxis2=dict(
-                    title="Revenue Growth (%)",
-                    overlaying="y",
-                    side="right",
-                ),
-                template="plotly_dark",
-                legend=dict(
-                    orientation="h",
-                    yanchor="bottom",
-                    y=1.02,
-                    xanchor="right",
-                    x=1,
-                ),
-                hovermode="x unified",
-                margin=dict(l=60, r=150, t=50, b=80),
-                xaxis=dict(
-                    tickangle=0,
-                ),
-            )
-
-            st.plotly_chart(fig, use_container_width=True)
+            render_chart(_build_health_chart(), f"overview-health-{data_key}")
 
         st.markdown("---")
 
@@ -259,34 +259,36 @@ def show():
                 "current_ratio",
                 "revenue_growth",
             ]
-        ].copy()
-
-        display_df.columns = [
-            "Symbol",
-            "Company",
-            "Year",
-            "Gross Margin %",
-            "Operating Margin %",
-            "Net Margin %",
-            "Current Ratio",
-            "Revenue Growth %",
-        ]
-
-        # Format percentages and ratios
-        for col in [
-            "Gross Margin %",
-            "Operating Margin %",
-            "Net Margin %",
-            "Revenue Growth %",
-        ]:
-            display_df[col] = display_df[col].apply(
-                lambda x: f"{x:.2f}" if pd.notna(x) else "N/A"
-            )
-
-        display_df["Current Ratio"] = display_df["Current Ratio"].apply(
-            lambda x: f"{x:.2f}" if pd.notna(x) else "N/A"
+        ].set_axis(  # seleção já é um frame novo: renomeia sem .copy()
+            [
+                "Symbol",
+                "Company",
+                "Year",
+                "Gross Margin %",
+                "Operating Margin %",
+                "Net Margin %",
+                "Current Ratio",
+                "Revenue Growth %",
+            ],
+            axis=1,
         )
 
-        st.dataframe(display_df, use_container_width=True, hide_index=True)
+        # Valores já vêm arredondados do SQL; formatação fica no front-end
+        number = st.column_config.NumberColumn(format="%.2f")
+        st.dataframe(
+            display_df,
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                col: number
+                for col in [
+                    "Gross Margin %",
+                    "Operating Margin %",
+                    "Net Margin %",
+                    "Current Ratio",
+                    "Revenue Growth %",
+                ]
+            },
+        )
     else:
         st.warning("⚠️ No data available. Please run ETL pipeline first.")
\ No newline at end of file
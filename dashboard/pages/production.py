@@ -1,13 +1,14 @@
 """Production guide and architecture documentation"""
 import streamlit as st
 import pandas as pd
+from pathlib import Path
 
 
-def show():
-    """About & Production Strategy"""
-    
-    # CSS customizado para esta página
-    st.markdown("""
+# Diagramas pré-renderizados em SVG (cacheáveis pelo browser via URL de mídia)
+_ASSETS_DIR = Path(__file__).resolve().parent.parent / "assets"
+
+# CSS e blocos estáticos como constantes de módulo (montados uma vez no import)
+_PAGE_CSS = """
     <style>
         .code-box {
             background-color: #1e1e1e;
@@ -47,7 +48,105 @@ def show():
             color: #856404;
         }
     </style>
-    """, unsafe_allow_html=True)
+    """
+
+_SCHEMA_TABLES_SQL = """
+        <div class="code-box">
+-- Companies Table
+CREATE TABLE companies (
+    id SERIAL PRIMARY KEY,
+    symbol VARCHAR(10) UNIQUE NOT NULL,
+    name VARCHAR(255) NOT NULL,
+    sector VARCHAR(100),
+    industry VARCHAR(100),
+    updated_at TIMESTAMP DEFAULT NOW()
+);
+CREATE INDEX idx_companies_symbol ON companies(symbol);
+CREATE INDEX idx_companies_updated ON companies(updated_at DESC);
+
+-- Financial Statements Table  
+CREATE TABLE financial_statements (
+    id SERIAL PRIMARY KEY,
+    company_id INTEGER REFERENCES companies(id),
+    fiscal_year INTEGER NOT NULL,
+    statement_type VARCHAR(20) NOT NULL,
+    line_item VARCHAR(100) NOT NULL,
+    value NUMERIC(20, 2),
+    created_at TIMESTAMP DEFAULT NOW()
+);
+CREATE INDEX idx_statements_company_year 
+    ON financial_statements(company_id, fiscal_year DESC);
+CREATE INDEX idx_statements_type 
+    ON financial_statements(statement_type, line_item);
+CREATE INDEX idx_statements_composite 
+    ON financial_statements(company_id, fiscal_year, statement_type);
+        </div>
+        """
+
+_SCHEMA_METRICS_SQL = """
+        <div class="code-box">
+-- Calculated Metrics Table
+CREATE TABLE calculated_metrics (
+    id SERIAL PRIMARY KEY,
+    company_id INTEGER REFERENCES companies(id),
+    fiscal_year INTEGER NOT NULL,
+    metric_name VARCHAR(100) NOT NULL,
+    metric_value NUMERIC(15, 4),
+    metric_category VARCHAR(50),
+    calculated_at TIMESTAMP DEFAULT NOW()
+);
+CREATE INDEX idx_metrics_company_year 
+    ON calculated_metrics(company_id, fiscal_year DESC);
+CREATE INDEX idx_metrics_name 
+    ON calculated_metrics(metric_name);
+CREATE INDEX idx_metrics_category 
+    ON calculated_metrics(metric_category);
+CREATE INDEX idx_metrics_composite 
+    ON calculated_metrics(company_id, fiscal_year, metric_name);
+
+-- ETL Audit Log
+CREATE TABLE etl_runs (
+    id SERIAL PRIMARY KEY,
+    run_date TIMESTAMP DEFAULT NOW(),
+    workflow_name VARCHAR(100),
+    companies_processed INTEGER,
+    api_calls_made INTEGER,
+    api_failures INTEGER,
+    execution_time_seconds INTEGER,
+    status VARCHAR(20)
+);
+CREATE INDEX idx_etl_runs_date ON etl_runs(run_date DESC);
+CREATE INDEX idx_etl_runs_status ON etl_runs(status);
+        </div>
+        """
+
+
+# Tabela estática de escala (não depende do banco); colunas Arrow evitam conversão no st.dataframe
+@st.cache_data(show_spinner=False)
+def _scaling_table():
+    """Static scaling-strategy table"""
+    return pd.DataFrame({
+        'Stage': ['Current', 'Phase 1', 'Phase 2', 'Phase 3'],
+        'Companies': [3, 10, 50, 100],
+        'Daily API Calls': [9, 30, 150, 300],
+        'Strategy': [
+            'Free tier (25/day)',
+            'Smart caching + free tier',
+            'Paid tier $50/mo (75/min)',
+            'Paid tier $500/mo (unlimited)'
+        ],
+        'Cache Hit Rate': ['0%', '70%', '85%', '90%'],
+        'Effective Calls': [9, 9, 22, 30],
+        'Monthly Cost': ['$0', '$0', '$50', '$500']
+    }).convert_dtypes(dtype_backend="pyarrow")
+
+
+@st.fragment
+def show():
+    """About & Production Strategy"""
+    
+    # CSS customizado para esta página
+    st.html(_PAGE_CSS)
     
     st.markdown("## 📚 Production Strategy & Architecture")
     
@@ -73,61 +172,7 @@ def _render_architecture():
     col1, col2 = st.columns([3, 2])
     
     with col1:
-        st.markdown("""
-        <div class="code-box">
-┌─────────────────────────────────────────────────────────┐
-│                   WINDBORNE FINANCE                     │
-│              Production Architecture                    │
-└─────────────────────────────────────────────────────────┘
-
-                 EXECUTION FLOW
-                 
-    ┌─────────────┐
-    │    n8n      │ ← Orchestrator
-    │  Scheduler  │   (8 AM daily)
-    └──────┬──────┘
-           │
-           ↓ [Schedule Trigger]
-           
-    ┌─────────────┐
-    │ HTTP Node   │ ← POST /run-etl
-    └──────┬──────┘
-           │
-           ↓
-           
-    ┌─────────────┐
-    │ Flask API   │ ← :5000
-    └──────┬──────┘
-           │
-           ↓
-           
-    ┌─────────────┐      ┌──────────────┐
-    │ ETL Python  │─────→│ Alpha Vantage│
-    │  Pipeline   │←─────│     API      │
-    └──────┬──────┘      └──────────────┘
-           │              • 5 calls/min
-           │              • 25 calls/day
-           ↓
-           
-    ┌─────────────┐
-    │ PostgreSQL  │ ← Storage
-    │  Database   │   • companies
-    │  (Docker)   │   • statements
-    └──────┬──────┘   • metrics
-           │
-           ↑ [reads data]
-           
-    ┌─────────────┐
-    │  Streamlit  │ ← Visualization
-    │  Dashboard  │   :8501
-    └─────────────┘
-    
-┌─────────────────────────────────────────────────────────┐
-│  Infrastructure: Docker on VPS                          │
-│  Management: Easypanel (Docker UI)                      │
-└─────────────────────────────────────────────────────────┘
-        </div>
-        """, unsafe_allow_html=True)
+        st.image(str(_ASSETS_DIR / "architecture.svg"), use_container_width=True)
     
     with col2:
         st.markdown("#### 🔧 Tech Stack")
@@ -151,7 +196,7 @@ def _render_architecture():
         - Error recovery
         
         **Visualization:**
-        - Streamlit 1.28+
+        - Streamlit 1.40+
         - Plotly charts
         - Responsive design
         
@@ -171,76 +216,10 @@ def _render_database_schema():
     col1, col2 = st.columns(2)
     
     with col1:
-        st.markdown("""
-        <div class="code-box">
--- Companies Table
-CREATE TABLE companies (
-    id SERIAL PRIMARY KEY,
-    symbol VARCHAR(10) UNIQUE NOT NULL,
-    name VARCHAR(255) NOT NULL,
-    sector VARCHAR(100),
-    industry VARCHAR(100),
-    updated_at TIMESTAMP DEFAULT NOW()
-);
-CREATE INDEX idx_companies_symbol ON companies(symbol);
-CREATE INDEX idx_companies_updated ON companies(updated_at DESC);
-
--- Financial Statements Table  
-CREATE TABLE financial_statements (
-    id SERIAL PRIMARY KEY,
-    company_id INTEGER REFERENCES companies(id),
-    fiscal_year INTEGER NOT NULL,
-    statement_type VARCHAR(20) NOT NULL,
-    line_item VARCHAR(100) NOT NULL,
-    value NUMERIC(20, 2),
-    created_at TIMESTAMP DEFAULT NOW()
-);
-CREATE INDEX idx_statements_company_year 
-    ON financial_statements(company_id, fiscal_year DESC);
-CREATE INDEX idx_statements_type 
-    ON financial_statements(statement_type, line_item);
-CREATE INDEX idx_statements_composite 
-    ON financial_statements(company_id, fiscal_year, statement_type);
-        </div>
-        """, unsafe_allow_html=True)
+        st.markdown(_SCHEMA_TABLES_SQL, unsafe_allow_html=True)
     
     with col2:
-        st.markdown("""
-        <div class="code-box">
--- Calculated Metrics Table
-CREATE TABLE calculated_metrics (
-    id SERIAL PRIMARY KEY,
-    company_id INTEGER REFERENCES companies(id),
-    fiscal_year INTEGER NOT NULL,
-    metric_name VARCHAR(100) NOT NULL,
-    metric_value NUMERIC(15, 4),
-    metric_category VARCHAR(50),
-    calculated_at TIMESTAMP DEFAULT NOW()
-);
-CREATE INDEX idx_metrics_company_year 
-    ON calculated_metrics(company_id, fiscal_year DESC);
-CREATE INDEX idx_metrics_name 
-    ON calculated_metrics(metric_name);
-CREATE INDEX idx_metrics_category 
-    ON calculated_metrics(metric_category);
-CREATE INDEX idx_metrics_composite 
-    ON calculated_metrics(company_id, fiscal_year, metric_name);
-
--- ETL Audit Log
-CREATE TABLE etl_runs (
-    id SERIAL PRIMARY KEY,
-    run_date TIMESTAMP DEFAULT NOW(),
-    workflow_name VARCHAR(100),
-    companies_processed INTEGER,
-    api_calls_made INTEGER,
-    api_failures INTEGER,
-    execution_time_seconds INTEGER,
-    status VARCHAR(20)
-);
-CREATE INDEX idx_etl_runs_date ON etl_runs(run_date DESC);
-CREATE INDEX idx_etl_runs_status ON etl_runs(status);
-        </div>
-        """, unsafe_allow_html=True)
+        st.markdown(_SCHEMA_METRICS_SQL, unsafe_allow_html=True)
     
     st.info("""
     **🎯 Indexing Rationale:**
@@ -268,46 +247,7 @@ def _render_question_1():
         col1, col2 = st.columns([2, 1])
         
         with col1:
-            st.markdown("""
-            <div class="code-box">
-┌─────────────────────────────────────────────────────────┐
-│         n8n Workflow: "WindBorne Monthly ETL"           │
-└─────────────────────────────────────────────────────────┘
-
-[1] Schedule Trigger
-    ├─ Cron: 0 8 1 * *        # Every 1st of month at 8 AM
-    ├─ Timezone: America/Sao_Paulo
-    └─ Active: ✓
-         │
-         ↓
-[2] HTTP Request Node
-    ├─ Method: POST
-    ├─ URL: http://etl:5000/run-etl
-    ├─ Timeout: 300000ms (5 min)
-    └─ Authentication: None
-         │
-         ↓
-[3] IF Node (Check Success)
-    ├─ Condition: {{ $json.status }} === "success"
-    └─ Split into two paths
-         │
-    ┌────┴────┐
-    │         │
-    ↓         ↓
-[4a] SET     [4b] SET
-Success Log   Error Alert
-    │         │
-    ↓         ↓
-[5a] Slack   [5b] Email
-Notification  Alert + Retry Logic
-    │
-    ↓
-[6] Google Sheets Export (optional)
-    ├─ Query PostgreSQL for latest metrics
-    ├─ Format as pivot table
-    └─ Update "Executive Dashboard" sheet
-            </div>
-            """, unsafe_allow_html=True)
+            st.image(str(_ASSETS_DIR / "n8n_workflow.svg"), use_container_width=True)
         
         with col2:
             st.markdown("""
@@ -520,27 +460,27 @@ def _render_question_2():
                                        key=lambda x: x):[1]
             if api_calls_today < DAILY_LIMIT:
                 fetch_and_store(symbol)
+        
+        # Strategy 3: Batched Writes (one statement per page, not per row)
+        from psycopg2.extras import execute_values
+        
+        execute_values(
+            cur,
+            '''INSERT INTO calculated_metrics
+               (company_id, fiscal_year, metric_name, metric_value, metric_category)
+               VALUES %s
+               ON CONFLICT (company_id, fiscal_year, metric_name)
+               DO UPDATE SET metric_value = EXCLUDED.metric_value''',
+            rows,  # list of tuples
+            page_size=10_000
+        )
+        # Bulk backfills: COPY calculated_metrics FROM STDIN
         ```
         """)
     
     st.markdown("#### 📊 Scaling Strategy")
     
-    scaling_data = pd.DataFrame({
-        'Stage': ['Current', 'Phase 1', 'Phase 2', 'Phase 3'],
-        'Companies': [3, 10, 50, 100],
-        'Daily API Calls': [9, 30, 150, 300],
-        'Strategy': [
-            'Free tier (25/day)',
-            'Smart caching + free tier',
-            'Paid tier $50/mo (75/min)',
-            'Paid tier $500/mo (unlimited)'
-        ],
-        'Cache Hit Rate': ['0%', '70%', '85%', '90%'],
-        'Effective Calls': [9, 9, 22, 30],
-        'Monthly Cost': ['$0', '$0', '$50', '$500']
-    })
-    
-    st.dataframe(scaling_data, use_container_width=True, hide_index=True)
+    st.dataframe(_scaling_table(), use_container_width=True, hide_index=True)
     
     st.info("""
     **💡 Key Insight:** With 90% cache hit rate (companies don't release statements daily), 
@@ -739,20 +679,26 @@ def _render_question_3():
             from google.cloud import bigquery
             import psycopg2
             
+            CHUNK_ROWS = 50_000  # load jobs in ≤50k-row slices
+            
             def sync_to_bigquery():
                 # Extract from PostgreSQL
                 pg_conn = psycopg2.connect(...)
                 df = pd.read_sql("SELECT * FROM calculated_metrics", engine)
                 
-                # Load to BigQuery
+                # Load to BigQuery: first slice replaces, the rest append
                 bq_client = bigquery.Client()
                 table_id = "windborne.financial_metrics"
                 
-                job = bq_client.load_table_from_dataframe(
-                    df, table_id, 
-                    write_disposition="WRITE_TRUNCATE"  # Replace
-                )
-                job.result()
+                for start in range(0, len(df), CHUNK_ROWS):
+                    job_config = bigquery.LoadJobConfig(
+                        write_disposition="WRITE_TRUNCATE" if start == 0
+                        else "WRITE_APPEND"
+                    )
+                    bq_client.load_table_from_dataframe(
+                        df.iloc[start:start + CHUNK_ROWS], table_id,
+                        job_config=job_config
+                    ).result()
             
             # Step 2: Connected Sheets in Google Sheets
             # 1. Extensions → BigQuery → Create connection
@@ -833,9 +779,35 @@ def _render_question_4():
         - Check response headers for rate limit info
         
         **Prevention:**
-        - Sleep 12s between API calls
-        - Track calls with counter
-        - Implement exponential backoff
+        - Client-side limiter instead of a fixed 12s sleep
+        - Sliding window of call timestamps (5 calls/min)
+        - Pause early when `x-ratelimit-remaining` ≤ 10%
+        - AIMD: +0.5 rpm per success, halve on 429
+        ```
+        class AlphaVantageLimiter:
+            def __init__(self, rpm=5):
+                self.max_rpm = rpm
+                self.rate = rpm          # AIMD-controlled calls/min
+                self.calls = deque()     # timestamps in the last 60s
+            
+            def wait_if_throttled(self):
+                now = time.monotonic()
+                while self.calls and now - self.calls[0] > 60:
+                    self.calls.popleft()
+                if len(self.calls) >= int(self.rate):
+                    time.sleep(60 - (now - self.calls[0]))
+                self.calls.append(time.monotonic())
+            
+            def on_response(self, resp):
+                if resp.status_code == 429:
+                    self.rate = max(1, self.rate * 0.5)   # multiplicative decrease
+                    return
+                self.rate = min(self.max_rpm, self.rate + 0.5)  # additive increase
+                remaining = resp.headers.get('x-ratelimit-remaining')
+                limit = resp.headers.get('x-ratelimit-limit')
+                if remaining and limit and int(remaining) <= 0.1 * int(limit):
+                    time.sleep(60)  # proactive pause near the ceiling
+        ```
         
         ---
         
@@ -964,17 +936,31 @@ def _render_question_4():
             
             return issues
         
-        # 2. Anomaly Detection
+        # 2. Anomaly Detection (robust: one outlier can't mask the next)
         def detect_anomalies(current, historical):
-            mean = historical.mean()
-            std = historical.std()
+            med = np.median(historical)
+            mad = np.median(np.abs(historical - med))
+            if mad == 0:
+                return
             
-            # 3-sigma rule
-            if current > mean + 3*std:
+            # Modified z-score (median + MAD)
+            z = 0.6745 * (current - med) / mad
+            if z > 3.5:
                 alert("Metric unusually high")
-            if current < mean - 3*std:
+            if z < -3.5:
                 alert("Metric unusually low")
         
+        # Multivariate: all metrics of a company/year at once
+        from sklearn.ensemble import IsolationForest
+        
+        forest = IsolationForest(contamination=0.02, n_estimators=100)
+        forest.fit(hist_matrix)  # rows = company/year, cols = metrics
+        if forest.decision_function([current_row])[0] < 0:
+            alert("Unusual metric combination")
+        
+        # Winsorize each metric before rollups (caps extreme values)
+        capped = df.clip(df.quantile(0.01), df.quantile(0.99), axis=1)
+        
         # 3. External Monitoring (Uptime Robot)
         # Ping: http://dashboard:8501/health
         # Frequency: Every 5 minutes
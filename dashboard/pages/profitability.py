@@ -1,8 +1,55 @@
 """Profitability analysis page with margin trends"""
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-from database import get_db_engine
+import plotly.graph_objects as go
+from database import get_connection, get_db_engine, load_companies, load_fiscal_years
+
+
+def _fetch_margins(companies: tuple, years: tuple) -> pd.DataFrame:
+    """Gross, operating and net margins per company/year (parameterized, one plan for any filter)"""
+    return get_connection().query("""
+        SELECT 
+            c.symbol,
+            cm.fiscal_year,
+            MAX(cm.metric_value) FILTER (WHERE cm.metric_name = 'gross_margin_pct')::float8 as gross_margin,
+            MAX(cm.metric_value) FILTER (WHERE cm.metric_name = 'operating_margin_pct')::float8 as operating_margin,
+            MAX(cm.metric_value) FILTER (WHERE cm.metric_name = 'net_margin_pct')::float8 as net_margin
+        FROM calculated_metrics cm
+        JOIN companies c ON cm.company_id = c.id
+        WHERE c.symbol = ANY(:symbols)
+        AND cm.fiscal_year = ANY(:years)
+        AND cm.metric_name IN ('gross_margin_pct', 'operating_margin_pct', 'net_margin_pct')
+        GROUP BY c.symbol, cm.fiscal_year
+        ORDER BY c.symbol, cm.fiscal_year
+    """, ttl=600, show_spinner=False, params={"symbols": list(companies), "years": list(years)})
+
+
+@st.cache_data(ttl=600, show_spinner=False)
+def _build_trend_chart(companies: tuple, years: tuple, metric_col: str):
+    """Per-company line chart of one margin (keyed on the filter tuples, not the DataFrame)"""
+    fig = go.Figure()
+    
+    # Traces montados direto (sem a inferência/mapeamento de cores do plotly.express)
+    for symbol, df_symbol in _fetch_margins(companies, years).groupby('symbol', sort=False):
+        fig.add_trace(go.Scattergl(
+            x=df_symbol['fiscal_year'].to_numpy(),
+            y=df_symbol[metric_col].to_numpy(),
+            mode='lines+markers',
+            name=symbol
+        ))
+    
+    fig.update_layout(
+        height=430,
+        xaxis_title="Company",
+        yaxis=dict(title="Current Ratio", side='left'),
+        yaxis2=dict(title="Revenue Growth (%)", overlaying='y', side='right'),
+        template="plotly_dark",
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
+        hovermode='x unified',
+        margin=dict(l=40, r=80, t=40, b=40)  # aumenta r para 80
+    )
+    fig.update_traces(line=dict(width=3), marker=dict(size=10))
+    return fig
 
 
 def show():
@@ -14,16 +61,18 @@ def show():
         st.error("❌ Cannot connect to database")
         return
     
+    _render_trends()
+
+
+@st.fragment
+def _render_trends():
+    """Filters and trend charts (reruns alone when a filter changes)"""
     try:
         # Filters
         col1, col2 = st.columns(2)
         
         with col1:
-            companies_df = pd.read_sql("""
-                SELECT DISTINCT symbol FROM companies ORDER BY symbol
-            """, engine
-            
-            )
+            companies_df = load_companies()
             selected_companies = st.multiselect(
                 "Select Companies",
                 companies_df['symbol'].tolist(),
@@ -31,10 +80,7 @@ def show():
             )
         
         with col2:
-            years_df = pd.read_sql("""
-                SELECT DISTINCT fiscal_year FROM calculated_metrics 
-                ORDER BY fiscal_year DESC
-            """, engine)
+            years_df = load_fiscal_years()
             selected_years = st.multiselect(
                 "Select Years",
                 years_df['fiscal_year'].tolist(),
@@ -45,29 +91,9 @@ def show():
             st.info("ℹ️ Please select at least one company and year")
             return
         
-        # Query data
-        companies_str = "','".join(selected_companies)
-        years_str = ",".join(map(str, selected_years))
-        
-        query = f"""
-            SELECT 
-                c.symbol,
-                cm.fiscal_year,
-                MAX(CASE WHEN cm.metric_name = 'gross_margin_pct' 
-                    THEN cm.metric_value END) as gross_margin,
-                MAX(CASE WHEN cm.metric_name = 'operating_margin_pct' 
-                    THEN cm.metric_value END) as operating_margin,
-                MAX(CASE WHEN cm.metric_name = 'net_margin_pct' 
-                    THEN cm.metric_value END) as net_margin
-            FROM calculated_metrics cm
-            JOIN companies c ON cm.company_id = c.id
-            WHERE c.symbol IN ('{companies_str}')
-            AND cm.fiscal_year IN ({years_str})
-            GROUP BY c.symbol, cm.fiscal_year
-            ORDER BY c.symbol, cm.fiscal_year
-        """
-        
-        df = pd.read_sql(query, engine)
+        companies = tuple(sorted(selected_companies))
+        years = tuple(sorted(selected_years))
+        df = _fetch_margins(companies, years)
         
         if df.empty:
             st.warning("⚠️ No data found for selected filters")
@@ -75,33 +101,14 @@ def show():
         
         # Create trend charts
         metrics = [
-            ('gross_margin', 'Gross Margin %', '#00CC96'),
-            ('operating_margin', 'Operating Margin %', '#AB63FA'),
-            ('net_margin', 'Net Margin %', '#FFA15A')
+            ('gross_margin', 'Gross Margin %'),
+            ('operating_margin', 'Operating Margin %'),
+            ('net_margin', 'Net Margin %')
         ]
         
-        for metric_col, title, color in metrics:
+        for metric_col, title in metrics:
             st.markdown(f"### {title}")
-            fig = px.line(
-                df,
-                x='fiscal_year',
-                y=metric_col,
-                color='symbol',
-                markers=True,
-                template="plotly_dark"
-            )
-            fig.update_layout(
-            height=430,
-            xaxis_title="Company",
-            yaxis=dict(title="Current Ratio", side='left'),
-            yaxis2=dict(title="Revenue Growth (%)", overlaying='y', side='right'),
-            template="plotly_dark",
-            legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
-            hovermode='x unified',
-            margin=dict(l=40, r=80, t=40, b=40)  # aumenta r para 80
-        )
-            fig.update_traces(line=dict(width=3), marker=dict(size=10))
-            st.plotly_chart(fig, use_container_width=True)
+            st.plotly_chart(_build_trend_chart(companies, years, metric_col), use_container_width=True)
             
     except Exception as e:
         st.error(f"❌ Error: {e}")
\ No newline at end of file
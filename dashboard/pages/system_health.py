@@ -1,24 +1,109 @@
 """System health and ETL monitoring page"""
 import streamlit as st
 import pandas as pd
-import plotly.graph_objects as go
-from database import get_db_engine
+from components.charts import render_chart
+from components.metrics import render_metrics_grid
+from database import get_db_engine, read_sql
 
 
-def color_status(val):
-    """Color code status values"""
-    if val == 'SUCCESS':
-        return 'background-color: #28a745; color: white'
-    elif val == 'FAILED':
-        return 'background-color: #dc3545; color: white'
-    elif val == 'RUNNING':
-        return 'background-color: #ffc107; color: black'
-    else:
-        return ''
+_STATUS_STYLES = {
+    'SUCCESS': 'background-color: #28a745; color: white',
+    'FAILED': 'background-color: #dc3545; color: white',
+    'RUNNING': 'background-color: #ffc107; color: black',
+}
 
 
+def color_status(col):
+    """Color code a status column (one call per column, not per cell)"""
+    return col.map(_STATUS_STYLES).fillna('')
+
+
+_HISTORY_PAGE_SIZE = 50
+
+# Colunas exibidas na tabela de histórico
+_HISTORY_COLUMNS = {
+    'run_date': "Date",
+    'status': "Status",
+    'companies_processed': "Companies",
+    'execution_time_seconds': "Duration (s)",
+    'api_calls_made': "API Calls",
+    'api_failures': "Failures",
+}
+
+# Formatação feita no browser (sem passes de string em Python)
+_HISTORY_COLUMN_CONFIG = {
+    "Date": st.column_config.DatetimeColumn(format="YYYY-MM-DD HH:mm"),
+    "Duration (s)": st.column_config.NumberColumn(format="%ds"),
+    "API Calls": st.column_config.NumberColumn(format="%d"),
+    "Failures": st.column_config.NumberColumn(format="%d"),
+}
+
+# Cor do marcador no timeline por status
+_STATUS_COLORS = {
+    'SUCCESS': '#28a745',
+    'FAILED': '#dc3545',
+}
+
+
+@st.cache_data(ttl=86400, show_spinner=False)
+def _load_etl_runs():
+    """ETL runs from the last 30 days plus the latest run, newest first, with the 30-day summary (one round-trip)"""
+    df = read_sql("""
+        SELECT 
+            run_date,
+            workflow_name,
+            companies_processed,
+            api_calls_made,
+            api_failures,
+            execution_time_seconds,
+            status,
+            COALESCE(100.0 * api_failures / NULLIF(api_calls_made, 0), 0) as failure_rate_pct,
+            run_date > NOW() - INTERVAL '30 days' as in_window,
+            s.total_runs,
+            s.success_rate,
+            s.avg_duration
+        FROM etl_runs
+        CROSS JOIN etl_runs_summary s
+        WHERE run_date > NOW() - INTERVAL '30 days'
+        OR run_date = (SELECT MAX(run_date) FROM etl_runs)
+        ORDER BY run_date DESC
+    """)
+    # Cores e datas formatadas calculadas uma vez por carga, não a cada render
+    df['marker_color'] = df['status'].map(_STATUS_COLORS)
+    df['run_date_str'] = pd.to_datetime(df['run_date']).dt.strftime("%Y-%m-%d %H:%M")
+    return df
+
+
+_TIMELINE_MAX_POINTS = 1000
+
+
+def _downsample_timeline(chart_data):
+    """Keep at most _TIMELINE_MAX_POINTS representative runs for the timeline chart"""
+    if len(chart_data) <= _TIMELINE_MAX_POINTS:
+        return chart_data
+    
+    try:
+        from tsdownsample import MinMaxLTTBDownsampler
+    except ImportError:
+        # tsdownsample é opcional; sem ele, amostragem uniforme
+        step = -(-len(chart_data) // _TIMELINE_MAX_POINTS)
+        return chart_data.iloc[::step]
+    
+    idx = MinMaxLTTBDownsampler().downsample(
+        chart_data['execution_time_seconds'].fillna(0).to_numpy(),
+        n_out=_TIMELINE_MAX_POINTS
+    )
+    return chart_data.iloc[idx]
+
+
+def _clear_etl_cache():
+    """Drop cached ETL reads so the next run hits etl_runs again"""
+    _load_etl_runs.clear()
+
+
+@st.fragment
 def show():
-    """System health and ETL monitoring"""
+    """System health and ETL monitoring (the refresh button and pagination rerun only this page)"""
     st.markdown("## 🔧 System Health & ETL Monitoring")
     
     engine = get_db_engine()
@@ -26,54 +111,35 @@ def show():
         st.error("❌ Cannot connect to database")
         return
     
+    # Recarrega só os dados de ETL (ex.: após disparar o ETL manualmente)
+    if st.button("🔄 Refresh ETL status", key="refresh_etl"):
+        _clear_etl_cache()
+    
     try:
+        runs = _load_etl_runs()
+        window = runs[runs['in_window']]
+        
         # Latest ETL run
-        df = pd.read_sql("""
-            SELECT 
-                run_date,
-                workflow_name,
-                companies_processed,
-                api_calls_made,
-                api_failures,
-                execution_time_seconds,
-                status
-            FROM etl_runs
-            ORDER BY run_date DESC
-            LIMIT 1
-        """, engine)
+        df = runs.iloc[:1]
         
         if not df.empty:
             st.markdown("### 📊 Latest Execution Status")
-            col1, col2, col3, col4 = st.columns(4)
-            
-            with col1:
-                status = df['status'].iloc[0]
-                st.metric(
-                    "Status",
-                    status,
-                    delta="OK" if status == "SUCCESS" else "ERROR",
-                    delta_color="normal" if status == "SUCCESS" else "inverse"
-                )
-            
-            with col2:
-                st.metric("Last Run", df['run_date'].iloc[0].strftime("%Y-%m-%d %H:%M"))
-            
-            with col3:
-                st.metric("Duration", f"{df['execution_time_seconds'].iloc[0]}s")
-            
-            with col4:
-                st.metric("Companies", df['companies_processed'].iloc[0])
+            latest = df.iloc[0]
+            status = latest['status']
+            render_metrics_grid([
+                ("Status", status, ("OK", True) if status == "SUCCESS" else ("ERROR", False)),
+                ("Last Run", latest['run_date_str'], None),
+                ("Duration", f"{latest['execution_time_seconds']}s", None),
+                ("Companies", latest['companies_processed'], None),
+            ])
             
             # API stats
             st.markdown("### 📞 API Statistics")
-            col5, col6, col7 = st.columns(3)
-            with col5:
-                st.metric("API Calls Made", df['api_calls_made'].iloc[0])
-            with col6:
-                st.metric("API Failures", df['api_failures'].iloc[0])
-            with col7:
-                failure_rate = (df['api_failures'].iloc[0] / df['api_calls_made'].iloc[0] * 100) if df['api_calls_made'].iloc[0] > 0 else 0
-                st.metric("Failure Rate", f"{failure_rate:.1f}%")
+            render_metrics_grid([
+                ("API Calls Made", latest['api_calls_made'], None),
+                ("API Failures", latest['api_failures'], None),
+                ("Failure Rate", f"{latest['failure_rate_pct']:.1f}%", None),
+            ])
         else:
             st.warning("⚠️ No ETL runs found. Run ETL pipeline first!")
             st.info("👉 Trigger ETL via Flask API: curl -X POST http://your-ip:5000/run-etl")
@@ -83,56 +149,55 @@ def show():
         # Execution history
         st.markdown("### 📊 Execution History (Last 30 days)")
         
-        df_history = pd.read_sql("""
-            SELECT 
-                run_date as "Date",
-                status as "Status",
-                companies_processed as "Companies",
-                execution_time_seconds as "Duration (s)",
-                api_calls_made as "API Calls",
-                api_failures as "Failures"
-            FROM etl_runs
-            WHERE run_date > NOW() - INTERVAL '30 days'
-            ORDER BY run_date DESC
-        """, engine)
+        # Paginação: só uma página de runs vai para o browser
+        total_pages = max(1, -(-len(window) // _HISTORY_PAGE_SIZE))
+        page = 0
+        if total_pages > 1:
+            page = st.number_input(
+                f"Page (of {total_pages})",
+                min_value=1,
+                max_value=total_pages,
+                value=1
+            ) - 1
+        
+        df_history = (
+            window.iloc[page * _HISTORY_PAGE_SIZE:(page + 1) * _HISTORY_PAGE_SIZE]
+            [list(_HISTORY_COLUMNS)]
+            .rename(columns=_HISTORY_COLUMNS)
+        )
         
         if not df_history.empty:
             # Apply styling to status column (CORRIGIDO: usar df_history)
-            styled_df = df_history.style.map(color_status, subset=['Status'])
+            styled_df = df_history.style.apply(color_status, subset=['Status'])
             
-            st.dataframe(styled_df, use_container_width=True, hide_index=True)
+            st.dataframe(
+                styled_df,
+                use_container_width=True,
+                hide_index=True,
+                column_config=_HISTORY_COLUMN_CONFIG
+            )
             
             # Success rate chart
             st.markdown("### 📈 Execution Timeline")
             
             # Prepare data for chart
-            chart_data = pd.read_sql("""
-                SELECT 
-                    run_date,
-                    execution_time_seconds,
-                    status
-                FROM etl_runs
-                WHERE run_date > NOW() - INTERVAL '30 days'
-                ORDER BY run_date ASC
-            """, engine)
+            chart_data = _downsample_timeline(window.iloc[::-1])
             
             if not chart_data.empty:
-                fig = go.Figure()
+                # plotly só é importado quando há timeline para desenhar
+                import plotly.graph_objects as go
                 
-                # Color by status
-                colors = chart_data['status'].map({
-                    'SUCCESS': '#28a745',
-                    'FAILED': '#dc3545'
-                })
+                fig = go.Figure()
                 
-                fig.add_trace(go.Scatter(
-                    x=chart_data['run_date'],
-                    y=chart_data['execution_time_seconds'],
+                fig.add_trace(go.Scattergl(
+                    x=chart_data['run_date'].to_numpy(),
+                    # float32 halves the payload; NULL durations become NaN gaps
+                    y=chart_data['execution_time_seconds'].to_numpy(dtype='float32', na_value=float('nan')),
                     mode='lines+markers',
                     name='Execution Time',
                     line=dict(color='#636EFA', width=2),
                     marker=dict(
-                        color=colors,
+                        color=chart_data['marker_color'].to_numpy(),
                         size=12,
                         line=dict(width=2, color='white')
                     ),
@@ -148,29 +213,17 @@ def show():
                     hovermode='x unified'
                 )
                 
-                st.plotly_chart(fig, use_container_width=True)
-                
-                # Success rate and stats
-                col1, col2, col3 = st.columns(3)
-                
-                with col1:
-                    success_rate = (chart_data['status'] == 'SUCCESS').mean() * 100
-                    st.metric(
-                        "Success Rate (30 days)",
-                        f"{success_rate:.1f}%"
-                    )
-                
-                with col2:
-                    st.metric(
-                        "Total Runs",
-                        len(chart_data)
-                    )
+                # Chave muda a cada novo run, invalidando o SVG em cache
+                render_chart(fig, f"etl-timeline-{len(chart_data)}-{chart_data['run_date'].iloc[-1]}")
                 
-                with col3:
-                    st.metric(
-                        "Avg Duration",
-                        f"{chart_data['execution_time_seconds'].mean():.0f}s"
-                    )
+                # Success rate and stats (agregados de etl_runs_summary, iguais em todas as linhas)
+                summary = runs.iloc[0]
+                avg_duration = summary['avg_duration']
+                render_metrics_grid([
+                    ("Success Rate (30 days)", f"{summary['success_rate']:.1f}%", None),
+                    ("Total Runs", summary['total_runs'], None),
+                    ("Avg Duration", f"{avg_duration:.0f}s" if pd.notna(avg_duration) else "N/A", None),
+                ])
         else:
             st.info("👉 No execution history yet. ETL will run daily at 8 AM BRT.")
         
@@ -1,10 +1,34 @@
 from flask import Flask, jsonify, request
 import subprocess
 import os
+import threading
 from datetime import datetime
 
 app = Flask(__name__)
 
+# Pool criado no primeiro /status e reaproveitado entre requests (Flask é threaded);
+# o lock evita que requests simultâneos criem pools duplicados
+_pool = None
+_pool_lock = threading.Lock()
+
+def _get_pool():
+    """Lazily create the shared connection pool for read-only endpoints"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                from psycopg2.pool import ThreadedConnectionPool
+                
+                _pool = ThreadedConnectionPool(
+                    1, 4,
+                    host=os.getenv('POSTGRES_HOST', 'postgres'),
+                    port=os.getenv('POSTGRES_PORT', 5432),
+                    database=os.getenv('POSTGRES_DB', 'windborne_finance'),
+                    user=os.getenv('POSTGRES_USER', 'postgres'),
+                    password=os.getenv('POSTGRES_PASSWORD')
+                )
+    return _pool
+
 @app.route('/health', methods=['GET'])
 def health():
     """Health check endpoint"""
@@ -60,54 +84,53 @@ def run_etl():
 def status():
     """Get last ETL run status from database"""
     try:
-        import psycopg2
-        
-        conn = psycopg2.connect(
-            host=os.getenv('POSTGRES_HOST', 'postgres'),
-            port=os.getenv('POSTGRES_PORT', 5432),
-            database=os.getenv('POSTGRES_DB', 'windborne_finance'),
-            user=os.getenv('POSTGRES_USER', 'postgres'),
-            password=os.getenv('POSTGRES_PASSWORD')
-        )
-        
-        cur = conn.cursor()
-        cur.execute("""
-            SELECT 
-                run_date,
-                workflow_name,
-                companies_processed,
-                api_calls_made,
-                execution_time_seconds,
-                status
-            FROM etl_runs
-            ORDER BY run_date DESC
-            LIMIT 1
-        """)
-        
-        row = cur.fetchone()
-        
-        if row:
-            return jsonify({
-                "last_run": {
-                    "date": row[0].isoformat(),
-                    "workflow": row[1],
-                    "companies": row[2],
-                    "api_calls": row[3],
-                    "duration": row[4],
-                    "status": row[5]
-                }
-            }), 200
-        else:
-            return jsonify({"message": "No ETL runs found"}), 404
+        pool = _get_pool()
+        conn = pool.getconn()
+    except Exception as e:
+        return jsonify({
+            "status": "error",
+            "message": str(e)
+        }), 500
+    
+    try:
+        # putconn no finally devolve a conexão ao pool mesmo nos returns abaixo
+        with conn.cursor() as cur:
+            cur.execute("""
+                SELECT 
+                    run_date,
+                    workflow_name,
+                    companies_processed,
+                    api_calls_made,
+                    execution_time_seconds,
+                    status
+                FROM etl_runs
+                ORDER BY run_date DESC
+                LIMIT 1
+            """)
+            
+            row = cur.fetchone()
             
-        cur.close()
-        conn.close()
+            if row:
+                return jsonify({
+                    "last_run": {
+                        "date": row[0].isoformat(),
+                        "workflow": row[1],
+                        "companies": row[2],
+                        "api_calls": row[3],
+                        "duration": row[4],
+                        "status": row[5]
+                    }
+                }), 200
+            else:
+                return jsonify({"message": "No ETL runs found"}), 404
         
     except Exception as e:
         return jsonify({
             "status": "error",
             "message": str(e)
         }), 500
+    finally:
+        pool.putconn(conn)
 
 if __name__ == '__main__':
     print("🚀 WindBorne ETL API Starting...")
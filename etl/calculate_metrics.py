@@ -20,23 +20,45 @@ def main():
     loader = PostgresLoader()
     calculator = FinancialMetricsCalculator(loader)
     
-    # Get all companies
-    with loader.get_connection() as conn:
-        with conn.cursor() as cur:
-            cur.execute("SELECT id, symbol FROM companies")
-            companies = cur.fetchall()
+    # Bancos antigos podem não ter as views que o dashboard lê
+    try:
+        loader.ensure_dashboard_views()
+    except Exception as e:
+        logger.error(f"Failed to create dashboard views: {e}")
     
-    logger.info(f"Calculating metrics for {len(companies)} companies...")
-    
-    for company_id, symbol in companies:
-        logger.info(f"Processing {symbol}...")
+    try:
+        # Get all companies
+        with loader.get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT id, symbol FROM companies")
+                companies = cur.fetchall()
+        
+        logger.info(f"Calculating metrics for {len(companies)} companies...")
+        
+        for company_id, symbol in companies:
+            logger.info(f"Processing {symbol}...")
+            try:
+                calculator.calculate_all_metrics(company_id)
+                logger.info(f"✓ Completed {symbol}")
+            except Exception as e:
+                logger.error(f"Failed to calculate metrics for {symbol}: {e}")
+        
+        logger.info("✓ All metrics calculated")
+        
+        # Filtros e Overview do dashboard só veem as novas métricas após o refresh
+        try:
+            loader.refresh_filter_options()
+        except Exception as e:
+            logger.error(f"Failed to refresh filter options: {e}")
+        
         try:
-            calculator.calculate_all_metrics(company_id)
-            logger.info(f"✓ Completed {symbol}")
+            loader.refresh_latest_per_company()
         except Exception as e:
-            logger.error(f"Failed to calculate metrics for {symbol}: {e}")
+            logger.error(f"Failed to refresh latest-per-company view: {e}")
     
-    logger.info("✓ All metrics calculated")
+    finally:
+        # Fecha o pool de conexões do loader
+        loader.close()
 
 if __name__ == "__main__":
     main()
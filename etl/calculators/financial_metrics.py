@@ -179,22 +179,25 @@ class FinancialMetricsCalculator:
             
         with self.loader.get_connection() as conn:
             with conn.cursor() as cur:
-                for metric in metrics:
-                    cur.execute("""
-                        INSERT INTO calculated_metrics (
-                            company_id, fiscal_year, metric_name, 
-                            metric_value, metric_category
-                        ) VALUES (%s, %s, %s, %s, %s)
-                        ON CONFLICT (company_id, fiscal_year, metric_name)
-                        DO UPDATE SET
-                            metric_value = EXCLUDED.metric_value,
-                            metric_category = EXCLUDED.metric_category,
-                            calculated_at = NOW()
-                    """, (
+                # Um único INSERT multi-row em vez de um round-trip por métrica
+                psycopg2.extras.execute_values(cur, """
+                    INSERT INTO calculated_metrics (
+                        company_id, fiscal_year, metric_name, 
+                        metric_value, metric_category
+                    ) VALUES %s
+                    ON CONFLICT (company_id, fiscal_year, metric_name)
+                    DO UPDATE SET
+                        metric_value = EXCLUDED.metric_value,
+                        metric_category = EXCLUDED.metric_category,
+                        calculated_at = NOW()
+                """, [
+                    (
                         company_id,
                         fiscal_year,
                         metric['metric_name'],
                         metric['metric_value'],
                         metric['metric_category']
-                    ))
+                    )
+                    for metric in metrics
+                ], page_size=10000)
                 conn.commit()
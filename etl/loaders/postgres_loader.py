@@ -1,5 +1,7 @@
+from contextlib import contextmanager
 import psycopg2
 from psycopg2.extras import execute_values, Json
+from psycopg2.pool import ThreadedConnectionPool
 from typing import List, Dict, Optional
 import logging
 import sys
@@ -9,6 +11,73 @@ from config import settings
 
 logger = logging.getLogger(__name__)
 
+# DDL idempotente das views materializadas do dashboard (espelha init-db/schema.sql),
+# aplicada no início do ETL para bancos criados antes delas existirem
+DASHBOARD_VIEWS_DDL = [
+    """
+    CREATE MATERIALIZED VIEW IF NOT EXISTS etl_runs_summary AS
+    SELECT 
+        1 as id,
+        COUNT(*) as total_runs,
+        AVG(CASE status WHEN 'SUCCESS' THEN 1.0 ELSE 0.0 END) * 100 as success_rate,
+        AVG(execution_time_seconds) as avg_duration,
+        NOW() as refreshed_at
+    FROM etl_runs
+    WHERE run_date > NOW() - INTERVAL '30 days'
+    """,
+    "CREATE UNIQUE INDEX IF NOT EXISTS idx_etl_runs_summary_id ON etl_runs_summary(id)",
+    """
+    CREATE MATERIALIZED VIEW IF NOT EXISTS mv_filter_options AS
+    SELECT DISTINCT 
+        c.symbol,
+        cm.fiscal_year
+    FROM calculated_metrics cm
+    JOIN companies c ON cm.company_id = c.id
+    """,
+    "CREATE UNIQUE INDEX IF NOT EXISTS idx_mv_filter_options ON mv_filter_options(symbol, fiscal_year)",
+    """
+    CREATE MATERIALIZED VIEW IF NOT EXISTS mv_latest_per_company AS
+    SELECT 
+        c.symbol,
+        c.name,
+        latest.fiscal_year,
+        ROUND(MAX(cm.metric_value) FILTER (WHERE cm.metric_name = 'gross_margin_pct'), 2) as gross_margin,
+        ROUND(MAX(cm.metric_value) FILTER (WHERE cm.metric_name = 'operating_margin_pct'), 2) as operating_margin,
+        ROUND(MAX(cm.metric_value) FILTER (WHERE cm.metric_name = 'net_margin_pct'), 2) as net_margin,
+        ROUND(MAX(cm.metric_value) FILTER (WHERE cm.metric_name = 'current_ratio'), 2) as current_ratio,
+        ROUND(MAX(cm.metric_value) FILTER (WHERE cm.metric_name = 'revenue_yoy_pct'), 2) as revenue_growth
+    FROM (
+        SELECT DISTINCT ON (company_id) company_id, fiscal_year
+        FROM calculated_metrics
+        ORDER BY company_id, fiscal_year DESC
+    ) latest
+    JOIN companies c ON c.id = latest.company_id
+    JOIN calculated_metrics cm 
+        ON cm.company_id = latest.company_id 
+        AND cm.fiscal_year = latest.fiscal_year
+    GROUP BY c.symbol, c.name, latest.fiscal_year
+    """,
+    "CREATE UNIQUE INDEX IF NOT EXISTS idx_mv_latest_per_company ON mv_latest_per_company(symbol)",
+]
+
+# Índices de cobertura do dashboard (espelham init-db/schema.sql) e os índices-prefixo
+# que eles substituem; CONCURRENTLY/VACUUM exigem autocommit, fora de transação
+DASHBOARD_INDEXES_DDL = [
+    """
+    CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_metrics_covering
+        ON calculated_metrics(company_id, fiscal_year, metric_name) INCLUDE (metric_value)
+    """,
+    "DROP INDEX CONCURRENTLY IF EXISTS idx_metrics_company_year",
+    # Atualiza o visibility map para o index-only scan valer já na primeira leitura
+    "VACUUM ANALYZE calculated_metrics",
+    """
+    CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_etl_runs_date_covering
+        ON etl_runs(run_date DESC)
+        INCLUDE (status, companies_processed, execution_time_seconds, api_calls_made, api_failures, workflow_name)
+    """,
+    "DROP INDEX CONCURRENTLY IF EXISTS idx_etl_runs_date",
+]
+
 class PostgresLoader:
     """Load data into PostgreSQL"""
     
@@ -20,14 +89,30 @@ class PostgresLoader:
             'user': settings.POSTGRES_USER,
             'password': settings.POSTGRES_PASSWORD
         }
+        self._pool = None
     
+    @contextmanager
     def get_connection(self):
-        """Create database connection"""
+        """Borrow a pooled connection (commit/rollback on exit, then return it to the pool)"""
         try:
-            return psycopg2.connect(**self.conn_params)
+            if self._pool is None:
+                self._pool = ThreadedConnectionPool(1, 8, **self.conn_params)
+            conn = self._pool.getconn()
         except Exception as e:
             logger.error(f"Failed to connect to database: {e}")
             raise
+        
+        try:
+            with conn:
+                yield conn
+        finally:
+            self._pool.putconn(conn)
+    
+    def close(self):
+        """Close every pooled connection"""
+        if self._pool is not None:
+            self._pool.closeall()
+            self._pool = None
     
     def get_company_id(self, symbol: str) -> Optional[int]:
         """Get company ID by symbol"""
@@ -110,3 +195,49 @@ class PostgresLoader:
                 })
                 conn.commit()
                 logger.info("✓ Logged ETL run to database")
+    
+    def ensure_dashboard_views(self):
+        """Create the dashboard materialized views and their unique indexes if missing"""
+        with self.get_connection() as conn:
+            with conn.cursor() as cur:
+                for ddl in DASHBOARD_VIEWS_DDL:
+                    cur.execute(ddl)
+                conn.commit()
+                logger.info("✓ Dashboard views in place")
+    
+    def ensure_dashboard_indexes(self):
+        """Create the dashboard covering indexes and drop the ones they supersede"""
+        # Conexão dedicada: o "with conn" do pool sempre abre transação
+        conn = psycopg2.connect(**self.conn_params)
+        try:
+            conn.autocommit = True
+            with conn.cursor() as cur:
+                for ddl in DASHBOARD_INDEXES_DDL:
+                    cur.execute(ddl)
+            logger.info("✓ Dashboard indexes in place")
+        finally:
+            conn.close()
+    
+    def refresh_etl_summary(self):
+        """Refresh the etl_runs_summary materialized view read by the dashboard"""
+        with self.get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("REFRESH MATERIALIZED VIEW CONCURRENTLY etl_runs_summary")
+                conn.commit()
+                logger.info("✓ Refreshed ETL summary view")
+    
+    def refresh_filter_options(self):
+        """Refresh the mv_filter_options materialized view used by dashboard filters"""
+        with self.get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("REFRESH MATERIALIZED VIEW CONCURRENTLY mv_filter_options")
+                conn.commit()
+                logger.info("✓ Refreshed filter options view")
+    
+    def refresh_latest_per_company(self):
+        """Refresh the mv_latest_per_company materialized view read by the Overview page"""
+        with self.get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("REFRESH MATERIALIZED VIEW CONCURRENTLY mv_latest_per_company")
+                conn.commit()
+                logger.info("✓ Refreshed latest-per-company view")
@@ -43,6 +43,17 @@ def main():
     loader = PostgresLoader()
     calculator = FinancialMetricsCalculator(loader)
     
+    # Bancos antigos podem não ter as views que o dashboard lê
+    try:
+        loader.ensure_dashboard_views()
+    except Exception as e:
+        logger.error(f"Failed to create dashboard views: {e}")
+    
+    try:
+        loader.ensure_dashboard_indexes()
+    except Exception as e:
+        logger.error(f"Failed to create dashboard indexes: {e}")
+    
     # Statistics tracking
     stats = {
         'workflow_name': 'windborne_etl',
@@ -133,6 +144,21 @@ def main():
         except Exception as e:
             logger.error(f"Failed to log ETL run: {e}")
         
+        try:
+            loader.refresh_etl_summary()
+        except Exception as e:
+            logger.error(f"Failed to refresh ETL summary: {e}")
+        
+        try:
+            loader.refresh_filter_options()
+        except Exception as e:
+            logger.error(f"Failed to refresh filter options: {e}")
+        
+        try:
+            loader.refresh_latest_per_company()
+        except Exception as e:
+            logger.error(f"Failed to refresh latest-per-company view: {e}")
+        
         # Print summary
         logger.info(f"\n{'='*60}")
         logger.info("Execution Summary:")
@@ -66,11 +66,16 @@ CREATE INDEX IF NOT EXISTS idx_statements_company_year
 CREATE INDEX IF NOT EXISTS idx_statements_type_metric 
     ON financial_statements(statement_type, metric_name);
     
-CREATE INDEX IF NOT EXISTS idx_metrics_company_year 
-    ON calculated_metrics(company_id, fiscal_year);
+-- Cobre os pivots MAX(CASE/FILTER ...) do dashboard: index-only scan sem ir ao heap
+-- (substitui idx_metrics_company_year, que era prefixo dele)
+CREATE INDEX IF NOT EXISTS idx_metrics_covering 
+    ON calculated_metrics(company_id, fiscal_year, metric_name) INCLUDE (metric_value);
     
-CREATE INDEX IF NOT EXISTS idx_etl_runs_date 
-    ON etl_runs(run_date DESC);
+-- Janela de 30 dias do System Health: index-only scan que para no limite da janela
+-- (substitui idx_etl_runs_date, que era prefixo dele)
+CREATE INDEX IF NOT EXISTS idx_etl_runs_date_covering 
+    ON etl_runs(run_date DESC) 
+    INCLUDE (status, companies_processed, execution_time_seconds, api_calls_made, api_failures, workflow_name);
     
 CREATE INDEX IF NOT EXISTS idx_companies_updated 
     ON companies(updated_at);
@@ -108,6 +113,57 @@ FROM etl_runs
 ORDER BY run_date DESC
 LIMIT 30;
 
+-- Resumo dos últimos 30 dias (materializada; o ETL dá REFRESH ao final de cada run)
+CREATE MATERIALIZED VIEW IF NOT EXISTS etl_runs_summary AS
+SELECT 
+    1 as id,
+    COUNT(*) as total_runs,
+    AVG(CASE status WHEN 'SUCCESS' THEN 1.0 ELSE 0.0 END) * 100 as success_rate,
+    AVG(execution_time_seconds) as avg_duration,
+    NOW() as refreshed_at
+FROM etl_runs
+WHERE run_date > NOW() - INTERVAL '30 days';
+
+-- Índice único exigido pelo REFRESH ... CONCURRENTLY
+CREATE UNIQUE INDEX IF NOT EXISTS idx_etl_runs_summary_id 
+    ON etl_runs_summary(id);
+
+-- Pares empresa/ano com métricas, usados nos filtros do dashboard (atualizada pelo ETL)
+CREATE MATERIALIZED VIEW IF NOT EXISTS mv_filter_options AS
+SELECT DISTINCT 
+    c.symbol,
+    cm.fiscal_year
+FROM calculated_metrics cm
+JOIN companies c ON cm.company_id = c.id;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_mv_filter_options 
+    ON mv_filter_options(symbol, fiscal_year);
+
+-- Métricas-chave do ano mais recente de cada empresa (Overview; atualizada pelo ETL)
+CREATE MATERIALIZED VIEW IF NOT EXISTS mv_latest_per_company AS
+SELECT 
+    c.symbol,
+    c.name,
+    latest.fiscal_year,
+    ROUND(MAX(cm.metric_value) FILTER (WHERE cm.metric_name = 'gross_margin_pct'), 2) as gross_margin,
+    ROUND(MAX(cm.metric_value) FILTER (WHERE cm.metric_name = 'operating_margin_pct'), 2) as operating_margin,
+    ROUND(MAX(cm.metric_value) FILTER (WHERE cm.metric_name = 'net_margin_pct'), 2) as net_margin,
+    ROUND(MAX(cm.metric_value) FILTER (WHERE cm.metric_name = 'current_ratio'), 2) as current_ratio,
+    ROUND(MAX(cm.metric_value) FILTER (WHERE cm.metric_name = 'revenue_yoy_pct'), 2) as revenue_growth
+FROM (
+    SELECT DISTINCT ON (company_id) company_id, fiscal_year
+    FROM calculated_metrics
+    ORDER BY company_id, fiscal_year DESC
+) latest
+JOIN companies c ON c.id = latest.company_id
+JOIN calculated_metrics cm 
+    ON cm.company_id = latest.company_id 
+    AND cm.fiscal_year = latest.fiscal_year
+GROUP BY c.symbol, c.name, latest.fiscal_year;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_mv_latest_per_company 
+    ON mv_latest_per_company(symbol);
+
 -- 7. Inserir empresas do desafio
 INSERT INTO companies (symbol, name, sector, industry) VALUES
 ('TEL', 'TE Connectivity', 'Technology', 'Electronic Components'),